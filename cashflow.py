@@ -0,0 +1,121 @@
+# cashflow.py
+"""
+Klasifikasi arus kas (operasi / investasi / pendanaan) untuk Laporan Arus Kas.
+
+Setiap baris akun kas diklasifikasikan sekaligus untuk satu kolom:
+aturan kata kunci deskripsi dikompilasi menjadi satu regex (urutan aturan =
+prioritas), lalu baris yang tidak cocok kata kunci apa pun diklasifikasikan
+dari akun lawan dominan di jurnal yang sama. Tidak bergantung pada
+Streamlit, sehingga bisa dipakai dari skrip/CLI.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+CASH_ACCOUNT = '1-1100'
+OPERATING, INVESTING, FINANCING = "operasi", "investasi", "pendanaan"
+
+# (kategori, kata kunci di deskripsi jurnal); aturan lebih atas menang
+KEYWORD_RULES = [
+    (FINANCING, ['prive', 'utang', 'pinjaman', 'angsuran']),
+    (INVESTING, ['aset', 'tanah', 'bangunan']),
+]
+# (kategori, awalan kode akun lawan); dipakai bila tidak ada kata kunci yang cocok
+COUNTER_ACCOUNT_RULES = [
+    (INVESTING, ['1-2']),         # aset tetap
+    (FINANCING, ['2-2', '3-']),   # liabilitas jangka panjang, ekuitas/prive
+]
+
+
+def _compile(rules, anchored):
+    """
+    Satu regex untuk semua aturan: cabang ke-i adalah lookahead yang mencari
+    salah satu pola aturan ke-i, sehingga aturan pertama yang cocok (bukan
+    posisi kecocokan paling kiri) yang menentukan kategori.
+    """
+    branches = []
+    for i, (_, patterns) in enumerate(rules):
+        alt = "|".join(re.escape(p) for p in patterns)
+        branches.append(f"(?=(?P<r{i}>{alt}))" if anchored else f"(?=.*?(?P<r{i}>{alt}))")
+    return re.compile("^(?:" + "|".join(branches) + ")", re.IGNORECASE | re.DOTALL)
+
+
+class CashFlowClassifier:
+    """Aturan kata kunci dan akun lawan yang sudah dikompilasi; `classify` bekerja per kolom."""
+
+    def __init__(self, keyword_rules=KEYWORD_RULES, counter_rules=COUNTER_ACCOUNT_RULES, cash_account=CASH_ACCOUNT):
+        self.keyword_rules, self.counter_rules = list(keyword_rules), list(counter_rules)
+        self.cash_account = cash_account
+        self._keywords = _compile(self.keyword_rules, anchored=False) if self.keyword_rules else None
+        self._counters = _compile(self.counter_rules, anchored=True) if self.counter_rules else None
+
+    @staticmethod
+    def _match(pattern, rules, text):
+        """Kategori per baris dari regex gabungan (None bila tidak ada yang cocok)."""
+        out = np.full(len(text), None, dtype=object)
+        if pattern is None or not len(text): return out
+        groups = text.str.extract(pattern)
+        # Paling banyak satu grup terisi per baris: cabang pertama yang cocok
+        for i in reversed(range(len(rules))):
+            out[groups[f"r{i}"].notna().to_numpy()] = rules[i][0]
+        return out
+
+    def counter_accounts(self, lines):
+        """Akun lawan dominan (nominal terbesar selain kas) per jurnal, dipetakan ke setiap baris."""
+        other = lines[lines['account_code'] != self.cash_account]
+        if other.empty: return pd.Series(None, index=lines.index, dtype=object)
+        size = other['debit_amount'] + other['credit_amount']
+        top = other.loc[size.groupby(other['journal_id']).idxmax(), ['journal_id', 'account_code']]
+        return lines['journal_id'].map(top.set_index('journal_id')['account_code'])
+
+    def classify(self, lines):
+        """
+        Baris kas dari `lines` (kolom journal_id, account_code, debit_amount,
+        credit_amount, description_entry) beserta `amount` (+masuk/-keluar),
+        `counter_account`, dan `category`.
+        """
+        cash = lines[lines['account_code'] == self.cash_account].copy()
+        cash['amount'] = np.where(cash['debit_amount'] > 0, cash['debit_amount'], -cash['credit_amount'])
+        cash['counter_account'] = self.counter_accounts(lines).loc[cash.index] if not cash.empty else None
+        desc = cash['description_entry'].astype(str) if 'description_entry' in cash.columns else pd.Series('', index=cash.index)
+        by_keyword = self._match(self._keywords, self.keyword_rules, desc)
+        by_counter = self._match(self._counters, self.counter_rules, cash['counter_account'].astype(object).fillna('').astype(str))
+        category = np.where(pd.notna(by_keyword), by_keyword, by_counter)
+        cash['category'] = np.where(pd.isna(category), OPERATING, category)
+        return cash
+
+    def statement(self, lines):
+        """Laporan Arus Kas (Deskripsi, Jumlah, Total) dari baris jurnal periode."""
+        if lines.empty: return pd.DataFrame(columns=['Deskripsi', 'Jumlah', 'Total'])
+        cash = self.classify(lines)
+        disp = cash['description_entry'] if 'description_entry' in cash.columns else pd.Series('Transaksi', index=cash.index)
+        label = ("  - " + disp.astype(str)).to_numpy(dtype=object)
+        amt, cat = cash['amount'].to_numpy(), cash['category'].to_numpy()
+
+        parts = []
+        def header(text): parts.append([[text, '', '']])
+        def details(mask):
+            parts.append(np.column_stack([label[mask], amt[mask].astype(object), np.full(mask.sum(), '', dtype=object)]))
+            # Skalar Python, bukan np.int64: kolom object tetap dikenali sebagai angka oleh formatter dan Arrow
+            return amt[mask].sum().item()
+        def total(text, value): parts.append([[text, '', value]])
+
+        op = cat == OPERATING
+        header('ARUS KAS DARI AKTIVITAS OPERASI'); header('Penerimaan Kas:'); t_op_in = details(op & (amt > 0))
+        header('Pengeluaran Kas:'); t_op_out = details(op & ~(amt > 0))
+        total('Arus Kas Bersih dari Operasi', t_op_in + t_op_out)
+        header('ARUS KAS DARI AKTIVITAS INVESTASI'); t_inv = details(cat == INVESTING)
+        total('Arus Kas Bersih dari Investasi', t_inv)
+        header('ARUS KAS DARI AKTIVITAS PENDANAAN'); t_fin = details(cat == FINANCING)
+        total('Arus Kas Bersih dari Pendanaan', t_fin)
+        total('KENAIKAN (PENURUNAN) BERSIH KAS', (t_op_in + t_op_out) + t_inv + t_fin)
+        rows = np.concatenate([np.asarray(p, dtype=object).reshape(-1, 3) for p in parts])
+        return pd.DataFrame(rows, columns=['Deskripsi', 'Jumlah', 'Total'])
+
+
+DEFAULT_CLASSIFIER = CashFlowClassifier()
+
+
+def cashflow_statement(lines, classifier=DEFAULT_CLASSIFIER):
+    """Laporan Arus Kas dengan aturan bawaan (atau `classifier` lain)."""
+    return classifier.statement(lines)
@@ -0,0 +1,85 @@
+# coa_tree.py
+"""
+Hierarki bagan akun: tipe -> grup -> ... -> akun, diturunkan dari kode akun.
+
+Kode `T-DDDD` dibaca sebagai tipe `T` (digit pertama, mis. 1 = Aset) dan
+digit-digit signifikan sesudah tanda hubung sebagai jalur grup. Nol di
+belakang hanya pengisi, jadi `1-1100` ada di grup `1-1`, sedangkan
+`1-1210` ada di `1-1` lalu `1-12`. Kedalaman grup mengikuti panjang kode.
+
+`rollup` menjumlahkan saldo akun ke semua tingkat (akun, grup, tipe)
+sekaligus dengan satu `np.add.at` atas pasangan (leluhur, akun).
+"""
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+
+def account_path(code):
+    """Jalur node dari tipe sampai grup terdalam (tanpa akun itu sendiri)."""
+    head, sep, tail = str(code).partition('-')
+    if not sep: head, tail = head[:1], head[1:]
+    digits = tail.rstrip('0')
+    return [head, *(f"{head}-{digits[:i]}" for i in range(1, max(len(digits), 2)) if digits[:i])]
+
+
+class AccountTree:
+    """Pohon akun yang dibangun sekali; node diidentifikasi dengan kode (tipe '1', grup '1-1', akun '1-1100')."""
+
+    def __init__(self, codes, names=None):
+        codes = [str(c) for c in codes]
+        self.codes = pd.Index(sorted(set(codes)), name='account_code')
+        names = pd.Series(list(names) if names is not None else codes, index=codes, dtype=object)
+        self.names = names[~names.index.duplicated()].reindex(self.codes)
+        nodes, parent, kind = {}, [], []
+        anc, leaf = [], []
+        for pos, code in enumerate(self.codes):
+            path = account_path(code)
+            for depth, node in enumerate([*path, code]):
+                if node not in nodes:
+                    nodes[node] = len(nodes)
+                    parent.append(nodes[path[depth - 1]] if depth else -1)
+                    kind.append('type' if depth == 0 else 'account' if node == code else 'group')
+            # Akun dihitung di dirinya sendiri dan di setiap leluhurnya (node unik, kode akun bisa sama dengan kode grup)
+            for node in dict.fromkeys([*path, code]):
+                anc.append(nodes[node]); leaf.append(pos)
+        self.nodes = pd.Index(list(nodes), name='node')
+        self.parent = np.array(parent, dtype=np.int64)
+        self.kind = np.array(kind, dtype=object)
+        self._anc, self._leaf = np.array(anc, dtype=np.int64), np.array(leaf, dtype=np.int64)
+        members = pd.Series(self.codes[self._leaf], index=self.nodes[self._anc])
+        self._members = {node: list(g) for node, g in members.groupby(level=0, sort=False)}
+
+    def accounts(self, node):
+        """Kode akun (terurut) di bawah `node`; kosong bila node tidak ada."""
+        return self._members.get(node, [])
+
+    def account_types(self, codes=None):
+        """Tipe (digit pertama, int; 0 bila bukan angka) per kode akun."""
+        codes = self.codes if codes is None else pd.Index(codes)
+        head = pd.Series([account_path(c)[0] for c in codes], index=codes)
+        return pd.to_numeric(head, errors='coerce').fillna(0).astype(int)
+
+    def rollup(self, values):
+        """
+        Jumlahkan `values` (Series/DataFrame berindeks kode akun) ke setiap node
+        dalam satu pass. Hasil berindeks node, kolom sama dengan `values`.
+        """
+        frame = values.to_frame() if isinstance(values, pd.Series) else values
+        leaf_vals = frame.reindex(self.codes, fill_value=0.0).to_numpy(dtype=float)
+        out = np.zeros((len(self.nodes), leaf_vals.shape[1]))
+        np.add.at(out, self._anc, leaf_vals[self._leaf])
+        res = pd.DataFrame(out, index=self.nodes, columns=frame.columns)
+        return res.iloc[:, 0] if isinstance(values, pd.Series) else res
+
+
+@lru_cache(maxsize=8)
+def _tree(items):
+    codes, names = zip(*items) if items else ((), ())
+    return AccountTree(list(codes), list(names))
+
+
+def account_tree(coa):
+    """Pohon untuk frame COA (account_code, account_name); dibangun sekali per isi COA."""
+    if coa is None or coa.empty: return _tree(())
+    return _tree(tuple(zip(coa['account_code'].astype(str), coa['account_name'].astype(str))))
@@ -0,0 +1,350 @@
+# financial_reports.py
+"""
+Penyusun laporan keuangan (Jurnal Umum, Buku Besar, Worksheet, Laba Rugi,
+Perubahan Modal, Posisi Keuangan, Arus Kas, Kartu Persediaan, komparatif)
+sebagai fungsi murni atas frame ledger: tanpa Streamlit dan tanpa klien
+Supabase, sehingga sama-sama dipakai halaman laporan dan CLI batch
+(`report_batch.py`).
+
+`period_data` menyiapkan frame periode dari snapshot `LedgerCache`, dan
+`period_reports` menyusun semua (atau sebagian) laporan satu periode.
+"""
+import numpy as np
+import pandas as pd
+from ledger_store import opening_balance, opening_frame, ADJUSTING_JOURNAL_ID
+from cashflow import cashflow_statement
+from coa_tree import account_tree
+
+# Digit pertama kode akun: 1-3 masuk Neraca (BS), 4-9 masuk Laba Rugi (IS)
+IS_TYPES = [4, 5, 6, 8, 9]
+BS_TYPES = [1, 2, 3]
+AKUN_MODAL = '3-1100'; AKUN_PRIVE = '3-1200'
+
+# --- PERIOD DATA ---
+def period_data(d, start, end):
+    """Jurnal periode [start, end] (gabung COA), COA, pergerakan persediaan, dan saldo awal per akun pada `start`, dari snapshot ledger `d`."""
+    if not d: return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), opening_frame()
+    
+    ent = d["entries"].copy(); lines = d["lines"]
+    opening = opening_balance(d, start)
+    if ent.empty or lines.empty:
+        return pd.DataFrame(columns=['account_code', 'account_name', 'transaction_date', 'debit_amount', 'credit_amount', 'journal_id', 'description_entry', 'id']), d["coa"], d["mov"], opening
+    
+    # [FIX] Konversi Tanggal yang Aman dari Timezone Error
+    ent['transaction_date'] = pd.to_datetime(ent['transaction_date'])
+    if ent['transaction_date'].dt.tz is not None:
+        ent['transaction_date'] = ent['transaction_date'].dt.tz_localize(None)
+    
+    filt = ent.loc[ent['transaction_date'].between(pd.to_datetime(start), pd.to_datetime(end))].copy()
+    
+    if 'description' in filt.columns: filt.rename(columns={'description': 'description_entry'}, inplace=True)
+    merged = lines.merge(filt, left_on='journal_id', right_on='id', suffixes=('_line', '_entry'))
+    # Info COA dipetakan lewat kategori account_code (per akun, bukan per baris); akun di luar COA dibuang
+    coa = d["coa"].drop_duplicates('account_code').set_index('account_code')
+    merged = merged[merged['account_code'].isin(coa.index)]
+    merged = merged.assign(**{c: merged['account_code'].map(coa[c]) for c in coa.columns})
+    return merged.sort_values(['transaction_date', 'journal_id', 'debit_amount'], ascending=[True, True, False]), d["coa"], d["mov"], opening
+
+def calc_tb(df, coa, opening=None):
+    """Menghitung Neraca Saldo (TB) berdasarkan Saldo Netto (Debit/Kredit murni), termasuk saldo awal jika ada.
+    `df` boleh None bila `opening` sudah berisi saldo s.d. akhir periode (mis. dari `BalanceIndex.as_of`)."""
+    if df is None: df = pd.DataFrame()
+    if opening is not None and not opening.empty:
+        cols = ['account_code', 'debit_amount', 'credit_amount']
+        df = pd.concat([df[cols], opening[cols]], ignore_index=True) if not df.empty else opening[cols]
+    if df.empty:
+        tb = coa[['account_code', 'account_name', 'account_type']].copy()
+        tb['Debit'] = 0.0; tb['Kredit'] = 0.0
+        tb['Tipe_Num'] = account_tree(coa).account_types(tb['account_code']).to_numpy()
+    else:
+        tb = df.groupby('account_code', observed=True).agg(D=('debit_amount', 'sum'), C=('credit_amount', 'sum')).reset_index()
+        tb = tb.merge(coa, on='account_code', how='right').fillna(0)
+        tb['Tipe_Num'] = account_tree(coa).account_types(tb['account_code']).to_numpy()
+        net = (tb['D'] - tb['C']).to_numpy()
+        
+        # Logika: Jika Net Positif, itu Debit. Jika Net Negatif, itu Kredit.
+        tb['Debit'] = np.where(net > 0, net, 0.0)
+        tb['Kredit'] = np.where(net < 0, -net, 0.0)
+    
+    return tb[['account_code', 'account_name', 'account_type', 'Debit', 'Kredit', 'Tipe_Num']].rename(columns={'account_code':'Kode Akun', 'account_name':'Nama Akun', 'account_type':'Tipe'}).sort_values('Kode Akun')
+
+def calc_worksheet(df, coa, opening=None):
+    """
+    Worksheet lengkap (TB, MJ, TB ADJ, IS, BS) dalam satu pass: satu groupby per
+    (umum/penyesuaian, akun), lalu semua kolom dihitung langsung dari array numerik.
+    """
+    cols = ['account_code', 'adjusting', 'debit_amount', 'credit_amount']
+    parts = []
+    if df is not None and not df.empty: parts.append(df.assign(adjusting=df['journal_id'] >= ADJUSTING_JOURNAL_ID)[cols])
+    if opening is not None and not opening.empty: parts.append(opening[cols])
+
+    codes = coa['account_code']
+    keys = pd.MultiIndex.from_product([[False, True], codes], names=['adjusting', 'account_code'])
+    if parts:
+        bal = pd.concat(parts, ignore_index=True).groupby(['adjusting', 'account_code'], observed=True)[['debit_amount', 'credit_amount']].sum()
+        bal = bal.reindex(keys, fill_value=0.0)
+    else:
+        bal = pd.DataFrame(0.0, index=keys, columns=['debit_amount', 'credit_amount'])
+
+    # Baris 0 = jurnal umum (TB), baris 1 = jurnal penyesuaian (MJ)
+    net = (bal['debit_amount'].to_numpy() - bal['credit_amount'].to_numpy()).reshape(2, -1)
+    tb_d, tb_k = np.where(net[0] > 0, net[0], 0.0), np.where(net[0] < 0, -net[0], 0.0)
+    mj_d, mj_k = np.where(net[1] > 0, net[1], 0.0), np.where(net[1] < 0, -net[1], 0.0)
+    net_adj = (tb_d - tb_k) + (mj_d - mj_k)
+    adj_d, adj_k = np.where(net_adj >= 0, net_adj, 0.0), np.where(net_adj >= 0, 0.0, -net_adj)
+
+    tipe = account_tree(coa).account_types(codes).to_numpy()
+    is_is, is_bs = np.isin(tipe, IS_TYPES), np.isin(tipe, BS_TYPES)
+    return pd.DataFrame({
+        'Kode Akun': codes.to_numpy(), 'Nama Akun': coa['account_name'].to_numpy(),
+        'Tipe': coa['account_type'].to_numpy(), 'Tipe_Num': tipe,
+        'TB D': tb_d, 'TB K': tb_k, 'MJ D': mj_d, 'MJ K': mj_k, 'TB ADJ D': adj_d, 'TB ADJ K': adj_k,
+        'IS Debit': np.where(is_is, adj_d, 0.0), 'IS Kredit': np.where(is_is, adj_k, 0.0),
+        'BS Debit': np.where(is_bs, adj_d, 0.0), 'BS Kredit': np.where(is_bs, adj_k, 0.0),
+    })
+
+def report_gj(df):
+    if df.empty: return pd.DataFrame(columns=['Tanggal', 'Deskripsi', 'Kode Akun', 'Nama Akun', 'Debit', 'Kredit'])
+    df = df.sort_values(['transaction_date', 'journal_id', 'debit_amount'], ascending=[True, True, False]).copy()
+    df['Tanggal'] = df['transaction_date'].dt.strftime('%Y-%m-%d')
+    if 'description_entry' not in df.columns: df['description_entry'] = ''
+    df['Nama Akun'] = df.apply(lambda r: f"       {r['account_name']}" if r['debit_amount']==0 else r['account_name'], axis=1)
+    is_first = df.groupby('journal_id').cumcount() == 0
+    df['Tanggal'] = np.where(is_first, df['Tanggal'], '')
+    df['description_entry'] = np.where(is_first, df['description_entry'], '')
+    return df[['Tanggal', 'account_code', 'Nama Akun', 'description_entry', 'debit_amount', 'credit_amount']].rename(columns={'account_code':'Kode Akun', 'description_entry':'Deskripsi', 'debit_amount':'Debit', 'credit_amount':'Kredit'})
+
+def report_gl(df, coa, opening=None, start=None):
+    """Buku Besar per akun. Saldo berjalan dimulai dari saldo awal (baris 'Saldo Awal') jika ada."""
+    cols = ['account_code', 'transaction_date', 'journal_id', 'description_entry', 'debit_amount', 'credit_amount']
+    gl = df.reindex(columns=cols).assign(Awal=0.0, is_awal=False)
+    if 'description_entry' not in df.columns: gl['description_entry'] = ''
+
+    # Saldo awal menjadi baris pertama setiap akun; nilainya ikut dijumlah kumulatif
+    if opening is not None and not opening.empty:
+        tot = opening.groupby('account_code', as_index=False)[['debit_amount', 'credit_amount']].sum()
+        awal = pd.DataFrame({'account_code': tot['account_code'], 'transaction_date': pd.Timestamp(start), 'journal_id': 0,
+                             'description_entry': 'Saldo Awal', 'debit_amount': 0.0, 'credit_amount': 0.0,
+                             'Awal': tot['debit_amount'] - tot['credit_amount'], 'is_awal': True})
+        gl = pd.concat([awal, gl], ignore_index=True) if not gl.empty else awal
+
+    # Info akun di-join sekali; akun yang tidak ada di COA dibuang
+    gl = gl.merge(coa[['account_code', 'account_name', 'normal_balance']].drop_duplicates('account_code'), on='account_code')
+    gl = gl.sort_values(['account_code', 'is_awal', 'transaction_date', 'journal_id', 'debit_amount'],
+                        ascending=[True, False, True, True, False], kind='mergesort')
+    if gl.empty: return pd.DataFrame()
+
+    is_debit = (gl['normal_balance'] == 'Debit').to_numpy()
+    is_credit = (gl['normal_balance'] == 'Credit').to_numpy()
+    net = (gl['debit_amount'] - gl['credit_amount']).to_numpy() + gl['Awal'].to_numpy()
+    gl['Saldo'] = np.where(is_debit, net, -net)
+    saldo = gl.groupby('account_code', sort=False)['Saldo'].cumsum().to_numpy()
+    pos = saldo >= 0
+
+    fin = pd.DataFrame({
+        'Kode': gl['account_code'].to_numpy(), 'Nama': gl['account_name'].to_numpy(),
+        'Tgl': gl['transaction_date'].dt.strftime('%Y-%m-%d').to_numpy(), 'Ket': gl['description_entry'].to_numpy(),
+        'Debit': gl['debit_amount'].to_numpy(), 'Kredit': gl['credit_amount'].to_numpy(),
+        'Saldo D': np.where(is_debit & pos, saldo, np.where(is_credit & ~pos, -saldo, 0.0)),
+        'Saldo K': np.where(is_credit & pos, saldo, np.where(is_debit & ~pos, -saldo, 0.0)),
+    })
+    is_fst = fin.groupby('Kode').cumcount() == 0
+    fin['Kode'] = np.where(is_fst, fin['Kode'], '')
+    fin['Nama'] = np.where(is_fst, fin['Nama'], '')
+    return fin
+
+def report_inv(mov):
+    """Laporan Kartu Persediaan (QTY TIDAK RP). Frame input (milik cache) tidak diubah."""
+    if mov.empty: return pd.DataFrame()
+    inv = pd.DataFrame({
+        'product_id': mov['product_id'].to_numpy(),
+        'Produk': mov['product_name'].to_numpy(),
+        'Tanggal': pd.to_datetime(mov['movement_date']).dt.strftime('%Y-%m-%d').to_numpy(),
+        'Jenis': mov['movement_type'].to_numpy(), 'Ref': mov['reference_id'].to_numpy(),
+        'q': mov['quantity_change'].to_numpy(), 'Biaya': mov['unit_cost'].to_numpy(),
+    })
+    # Nama produk diambil dari pergerakan pertamanya, lalu kartu diurutkan per produk & tanggal
+    inv['Produk'] = inv.groupby('product_id')['Produk'].transform('first')
+    inv = inv.sort_values(['product_id', 'Tanggal'], kind='mergesort', ignore_index=True)
+
+    q = inv['q'].to_numpy(); nilai = q * inv['Biaya'].to_numpy()
+    inv['Masuk'] = np.where(inv['Jenis'] == 'RECEIPT', q, 0)
+    inv['Keluar'] = np.where(inv['Jenis'] == 'ISSUE', np.abs(q), 0)
+    inv['Total'] = np.abs(nilai)
+    inv['Sisa Qty'] = inv.groupby('product_id')['q'].cumsum()
+    inv['Sisa Nilai'] = pd.Series(nilai).groupby(inv['product_id']).cumsum()
+
+    is_fst = inv.groupby('Produk').cumcount() == 0
+    inv['Produk'] = np.where(is_fst, inv['Produk'], '')
+    return inv[['Produk', 'Tanggal', 'Jenis', 'Ref', 'Masuk', 'Keluar', 'Biaya', 'Total', 'Sisa Qty', 'Sisa Nilai']]
+
+# Laporan yang ditampilkan, urut seperti sheet Excel
+REPORT_TITLES = {
+    "JU": "1. Jurnal Umum", "BB": "2. Buku Besar", "WS": "3. Worksheet", "IS": "4. Laba Rugi",
+    "RE": "5. Perubahan Modal", "BS": "6. Posisi Keuangan", "CF": "7. Arus Kas", "Kartu": "8. Kartu Persediaan",
+    "ISK": "9. Laba Rugi Komparatif", "BSK": "10. Posisi Keuangan Komparatif",
+}
+# Laporan komparatif: satu kolom per periode (kode frekuensi pandas -> label)
+COMPARATIVE_REPORTS = ["ISK", "BSK"]
+COMPARE_FREQS = {"M": "Bulanan", "Q": "Kuartalan", "Y": "Tahunan"}
+# Laporan yang lahir dari satu worksheet yang sama; dihitung bersama lalu dipecah
+CLOSING_REPORTS = ["WS", "IS", "RE", "BS", "Laba Bersih"]
+
+def closing_reports(coa, balances):
+    # Worksheet (TB -> MJ -> TB ADJ -> IS/BS) dihitung sekali dari saldo s.d. akhir periode, lalu TB ADJ dipakai untuk laporan
+    ws = calc_worksheet(None, coa, balances)
+    df_calc = ws[['Kode Akun', 'Nama Akun', 'Tipe', 'TB ADJ D', 'TB ADJ K', 'Tipe_Num']].rename(columns={'TB ADJ D':'Debit', 'TB ADJ K':'Kredit'})
+    
+    inc, is_df, re_df, bs_df = closing_statements(df_calc)
+    return {"WS": ws.drop(columns=['Tipe', 'Tipe_Num']), "IS": is_df, "RE": re_df, "BS": bs_df, "Laba Bersih": inc}
+
+def closing_statements(df_tb_adj):
+    """Laba bersih, Laba Rugi, Perubahan Modal, dan Posisi Keuangan dari TB ADJ."""
+    # Saldo TB ADJ digulung ke setiap tingkat pohon akun (akun -> grup -> tipe) sekali saja
+    tree = account_tree(df_tb_adj.rename(columns={'Kode Akun': 'account_code', 'Nama Akun': 'account_name'}))
+    D, K = rollup_sides(tree, df_tb_adj.set_index('Kode Akun')[['Debit']], df_tb_adj.set_index('Kode Akun')[['Kredit']])
+    Total_Revenue, Total_Expense = revenue_expense(D, K)
+    prive_val = node_value(D, AKUN_PRIVE)[0]
+    
+    # Modal Awal (Ambil dari TB Adj Kredit, sebelum ditambah Laba)
+    modal_awal = node_value(K, AKUN_MODAL)[0]
+    
+    Net_Income = (Total_Revenue - Total_Expense)[0]
+    Modal_Baru = modal_awal + Net_Income - prive_val
+    
+    df_is = create_income_statement_df(tree, D, K)
+    df_re = pd.DataFrame({'Deskripsi': ['Modal Awal', 'Laba Bersih Periode', 'Prive', 'Modal Akhir'], 'Jumlah': [modal_awal, Net_Income, -prive_val, Modal_Baru]})
+    df_bs = create_balance_sheet_df(tree, D, K, [Modal_Baru])
+    return Net_Income, df_is, df_re, df_bs
+
+# --- STATEMENT ROLLUPS ---
+def rollup_sides(tree, debit, kredit):
+    """Rollup sisi debit dan kredit (frame berindeks kode akun, kolom = periode) ke semua node pohon."""
+    D = tree.rollup(debit); K = tree.rollup(kredit)
+    K.columns = D.columns
+    return D, K
+
+def node_value(roll, node):
+    """Nilai satu node hasil rollup per kolom (nol bila node tidak ada di pohon)."""
+    return roll.loc[node].to_numpy() if node in roll.index else np.zeros(roll.shape[1])
+
+def revenue_expense(D, K):
+    """Total pendapatan (kredit tipe 4, 8) dan beban (debit tipe 5, 6, 9) dari node tipe."""
+    return node_value(K, '4') + node_value(K, '8'), node_value(D, '5') + node_value(D, '6') + node_value(D, '9')
+
+def income_statement_rows(tree, D, K):
+    """Baris Laba Rugi: (deskripsi, jenis 'header'/'detail'/'total', nilai per kolom)."""
+    rows = []
+    def accounts(node, side, sign=1, indent=''):
+        for code in tree.accounts(node): rows.append((indent + str(tree.names[code]), 'detail', sign * side.loc[code].to_numpy()))
+
+    rev, hpp, ops = node_value(K, '4'), node_value(D, '5'), node_value(D, '6')
+    rows.append(('PENDAPATAN', 'header', None)); accounts('4', K); rows.append(('TOTAL PENDAPATAN', 'total', rev))
+    rows.append(('HARGA POKOK PENJUALAN', 'header', None)); accounts('5', D); rows.append(('TOTAL COST OF GOODS SOLD', 'total', hpp))
+    rows.append(('LABA KOTOR', 'total', rev - hpp))
+    rows.append(('BEBAN OPERASIONAL', 'header', None)); accounts('6', D); rows.append(('TOTAL BEBAN OPERASIONAL', 'total', ops))
+    rows.append(('LABA OPERASI', 'total', rev - hpp - ops))
+    rows.append(('PENDAPATAN DAN BEBAN LAIN-LAIN', 'header', None))
+    rows.append(('Pendapatan Lain-lain:', 'header', None)); accounts('8', K, indent='  ')
+    rows.append(('Beban Lain-lain:', 'header', None)); accounts('9', D, sign=-1, indent='  ')
+    rows.append(('TOTAL PENDAPATAN & BEBAN LAIN', 'total', node_value(K, '8') - node_value(D, '9')))
+    revenue, expense = revenue_expense(D, K)
+    rows.append(('LABA BERSIH', 'total', revenue - expense))
+    return rows
+
+def balance_sheet_rows(tree, D, K, modal_akhir):
+    """Baris Posisi Keuangan; aset bersaldo debit - kredit, liabilitas kredit - debit."""
+    rows = []
+    def group(node, sign):
+        for code in tree.accounts(node): rows.append((str(tree.names[code]), 'detail', sign * (D.loc[code].to_numpy() - K.loc[code].to_numpy())))
+        return sign * (node_value(D, node) - node_value(K, node))
+
+    rows.append(('ASET', 'header', None)); rows.append(('Aset Lancar', 'header', None))
+    ca = group('1-1', 1); rows.append(('TOTAL ASET LANCAR', 'total', ca))
+    rows.append(('Aset Tetap', 'header', None))
+    fa = group('1-2', 1); rows.append(('TOTAL ASET TETAP', 'total', fa))
+    rows.append(('TOTAL ASET', 'total', ca + fa))
+    rows.append(('LIABILITAS & EKUITAS', 'header', None)); rows.append(('Liabilitas Lancar', 'header', None))
+    cl = group('2-1', -1); rows.append(('TOTAL LIABILITAS LANCAR', 'total', cl))
+    rows.append(('Liabilitas Jangka Panjang', 'header', None))
+    ll = group('2-2', -1); rows.append(('TOTAL LIABILITAS JANGKA PANJANG', 'total', ll))
+    rows.append(('TOTAL LIABILITAS', 'total', cl + ll))
+    rows.append(('Ekuitas', 'header', None))
+    rows.append(('Modal Pemilik Akhir', 'total', np.asarray(modal_akhir)))
+    rows.append(('TOTAL LIABILITAS & EKUITAS', 'total', cl + ll + np.asarray(modal_akhir)))
+    return rows
+
+def _single_period_df(rows, columns):
+    """Satu periode: nilai rinci di kolom kedua, total di kolom ketiga."""
+    data = [[label, '', ''] if kind == 'header' else [label, v[0], ''] if kind == 'detail' else [label, '', v[0]] for label, kind, v in rows]
+    return pd.DataFrame(data, columns=columns)
+
+def _comparative_df(rows, periods):
+    """Satu kolom per periode; baris judul dikosongkan."""
+    cols = [str(p) for p in periods]
+    data = [[label, *(v if v is not None else [''] * len(cols))] for label, _, v in rows]
+    return pd.DataFrame(data, columns=['Deskripsi', *cols])
+
+def create_income_statement_df(tree, D, K):
+    return _single_period_df(income_statement_rows(tree, D, K), ['Deskripsi', 'Jumlah', 'Total'])
+
+def create_balance_sheet_df(tree, D, K, Modal_Akhir):
+    return _single_period_df(balance_sheet_rows(tree, D, K, Modal_Akhir), ['Deskripsi', 'Jumlah 1', 'Jumlah 2'])
+
+def period_pivot(df, coa, start, end, freq):
+    """Mutasi netto (debit - kredit) per akun x periode dari satu groupby([account_code, periode])."""
+    periods = pd.period_range(start, end, freq=freq)
+    codes = pd.Index(coa['account_code'].sort_values(), name='account_code') if not coa.empty else pd.Index([], name='account_code')
+    if df.empty: return pd.DataFrame(0.0, index=codes, columns=periods)
+    net = (df['debit_amount'] - df['credit_amount']).groupby([df['account_code'], df['transaction_date'].dt.to_period(freq)], observed=True).sum()
+    return net.unstack(fill_value=0.0).reindex(index=codes, columns=periods, fill_value=0.0)
+
+def comparative_reports(df, coa, opening, start, end, freq):
+    """
+    Laba Rugi dan Posisi Keuangan komparatif dari satu pivot periode.
+    Laba Rugi memakai mutasi tiap periode; Posisi Keuangan memakai saldo akhir
+    tiap periode (saldo awal + kumulatif mutasi), sama seperti laporan tunggal
+    dengan tanggal akhir = akhir periode itu.
+    """
+    tree = account_tree(coa)
+    net = period_pivot(df, coa, start, end, freq)
+    base = pd.Series(0.0, index=net.index)
+    if opening is not None and not opening.empty:
+        base = (opening['debit_amount'] - opening['credit_amount']).groupby(opening['account_code']).sum().reindex(net.index, fill_value=0.0)
+    bal = net.cumsum(axis=1).add(base, axis=0)
+
+    D, K = rollup_sides(tree, net.clip(lower=0), (-net).clip(lower=0))
+    isk = _comparative_df(income_statement_rows(tree, D, K), net.columns)
+    D, K = rollup_sides(tree, bal.clip(lower=0), (-bal).clip(lower=0))
+    revenue, expense = revenue_expense(D, K)
+    modal = node_value(K, AKUN_MODAL) + (revenue - expense) - node_value(D, AKUN_PRIVE)
+    return {"ISK": isk, "BSK": _comparative_df(balance_sheet_rows(tree, D, K, modal), bal.columns)}
+
+def create_cashflow(df_journal):
+    """Laporan Arus Kas; klasifikasi kata kunci + akun lawan ada di modul `cashflow`."""
+    return cashflow_statement(df_journal)
+
+# --- REPORT SETS ---
+def build_report(name, data, start, end, freq="M"):
+    """Satu laporan berbasis jurnal periode dari `data` = (df, coa, mov, opening) hasil `period_data`."""
+    df, coa, mov, opening = data
+    if name == "comparative": return comparative_reports(df, coa, opening, start, end, freq)
+    if name == "JU": return report_gj(df)
+    if name == "BB": return report_gl(df, coa, opening, start)
+    if name == "CF": return create_cashflow(df)
+    if name == "Kartu": return report_inv(mov)
+    raise KeyError(name)
+
+def period_reports(d, start, end, freq="M", names=None, balances=None):
+    """
+    Laporan `names` (default semua, termasuk Laba Bersih) untuk [start, end] dari
+    snapshot ledger `d` yang jendelanya mencakup periode itu. Laporan penutup
+    memakai saldo s.d. `end` dari indeks saldo snapshot, kecuali `balances`
+    (frame saldo per akun/adjusting) diberikan.
+    """
+    names = list(names or [*REPORT_TITLES, "Laba Bersih"])
+    data = period_data(d, start, end) if any(n not in CLOSING_REPORTS for n in names) else None
+    closing = closing_reports(d["coa"], d["index"].as_of(end) if balances is None else balances) if any(n in CLOSING_REPORTS for n in names) else {}
+    comparative = build_report("comparative", data, start, end, freq) if any(n in COMPARATIVE_REPORTS for n in names) else {}
+    return {n: closing[n] if n in CLOSING_REPORTS else comparative[n] if n in COMPARATIVE_REPORTS else build_report(n, data, start, end, freq)
+            for n in names}
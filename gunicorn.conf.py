@@ -0,0 +1,61 @@
+# gunicorn.conf.py
+"""
+Konfigurasi server produksi webhook (dibaca otomatis oleh gunicorn dari direktori kerja):
+
+    gunicorn webhook_server:app
+
+Beberapa proses worker uvicorn berbagi satu port dan satu file antrean SQLite.
+Dengan preload, aplikasi diimpor sekali di master lalu di-fork; setiap worker
+membuat klien Supabase sendiri (post_fork). Saat deploy (SIGTERM), worker
+berhenti menerima request, menguras antrean dan menunggu posting yang sedang
+berjalan (WEBHOOK_DRAIN_TIMEOUT) lalu keluar; notifikasi yang belum sempat tetap
+di file antrean dan dikerjakan proses berikutnya.
+
+File antrean (WEBHOOK_QUEUE_PATH) harus berada di volume persisten; filesystem
+container dibuang setiap deploy. Image mengarahkannya ke /data, jadi pasang
+volume (mis. Railway volume) di /data.
+
+Pengaturan lewat environment: PORT, WEBHOOK_WORKERS (default jumlah CPU),
+WEBHOOK_PRELOAD (default 1), WEBHOOK_GRACEFUL_TIMEOUT (default 30 detik),
+WEBHOOK_QUEUE_PATH.
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEBHOOK_WORKERS", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = os.getenv("WEBHOOK_PRELOAD", "1") == "1"
+# Harus di atas WEBHOOK_DRAIN_TIMEOUT agar posting sempat selesai sebelum worker dimatikan paksa
+graceful_timeout = int(os.getenv("WEBHOOK_GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+accesslog = "-"
+
+# Metrik Prometheus digabung dari semua worker. Direktorinya disiapkan (dan metrik run
+# sebelumnya dibuang) di sini, bukan di on_starting: dengan preload, aplikasi sudah
+# diimpor sebelum hook itu dipanggil. Hanya direktori default milik konfigurasi ini yang
+# dikosongkan; direktori yang diatur operator lewat PROMETHEUS_MULTIPROC_DIR tidak disentuh
+METRICS_DIR = "/tmp/webhook_metrics"
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_DIR
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    queue_dir = os.path.dirname(os.path.abspath(os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.sqlite3")))
+    if not os.path.ismount(queue_dir):
+        print(f"PERINGATAN: antrean webhook di {queue_dir} bukan volume terpasang; notifikasi yang masih antre hilang saat deploy.")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import webhook_server
+        webhook_server.reset_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
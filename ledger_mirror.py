@@ -0,0 +1,263 @@
+# ledger_mirror.py
+"""
+Cermin lokal ledger dalam format Parquet, untuk start dingin cepat dan laporan offline.
+
+Setiap tabel (`entries`, `lines`, `coa`, `mov`) disimpan sebagai beberapa
+file part Parquet di satu direktori. Sinkronisasi hanya mengambil baris
+dengan id di atas high-water mark cermin dikurangi REFRESH_OVERLAP (agar
+baris yang ter-commit terlambat ikut tersusul; id yang sudah ada dibuang)
+lalu menulisnya sebagai part baru; `meta.json` (mark + daftar part)
+ditulis paling akhir secara atomik, jadi part yang setengah tertulis saat
+proses mati tidak pernah ikut terbaca.
+Tidak ada riwayat penuh yang disimpan di memori: jendela dibaca dengan filter
+pyarrow (hanya jurnal jendela dan baris jurnalnya), dan saldo awal
+diagregasi per part dari kolom yang perlu saja. Bila part satu tabel sudah
+terlalu banyak, semuanya digabung.
+
+CLI (tanpa Streamlit):
+    python ledger_mirror.py sync                        # tarik delta dari Supabase
+    python ledger_mirror.py info                        # mark, jumlah baris, waktu sinkron
+    python ledger_mirror.py export --start 2025-01-01 --end 2025-12-31 --out jurnal.xlsx
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+from ledger_store import (LEDGER_TABLES, MAX_WORKERS, REFRESH_OVERLAP, BalanceIndex, add_opening, aggregate_lines, build_frames,
+                          concat_frames, fetch_ledger_rows, line_dates, opening_frame, overlap_after, recent_ids, typed_frame)
+
+# Direktori cermin; string kosong mematikan cermin
+MIRROR_DIR = os.getenv("LEDGER_MIRROR_DIR", ".ledger_mirror")
+MIRROR_TABLES = ["entries", "lines", "coa", "mov"]
+# Part per tabel sebelum digabung menjadi satu file
+MAX_PARTS = 16
+
+_EMPTY_ROWS = {k: [] for k in MIRROR_TABLES}
+
+
+def _day(value):
+    return None if value is None else pd.Timestamp(value).normalize()
+
+
+def _ids(df):
+    return df['id'] if 'id' in df.columns else pd.Series([], dtype='int64')
+
+
+def _date_filter(start, end):
+    """Ekspresi pyarrow start <= transaction_date <= end (None = tanpa batas)."""
+    import pyarrow.dataset as ds
+    date, flt = ds.field('transaction_date'), None
+    if start is not None: flt = date >= start.to_pydatetime()
+    if end is not None: flt = (date <= end.to_pydatetime()) if flt is None else flt & (date <= end.to_pydatetime())
+    return flt
+
+
+class LedgerMirror:
+    """
+    Cermin Parquet satu direktori; aman dibaca dari banyak thread, ditulis oleh
+    satu proses. Tidak ada frame yang disimpan di memori: setiap pembacaan
+    hanya memuat kolom dan baris yang diminta dari part-nya.
+    """
+
+    def __init__(self, root=MIRROR_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self.meta = self._read_meta()
+
+    @property
+    def exists(self):
+        return self.meta["synced_at"] is not None
+
+    @property
+    def marks(self):
+        return dict(self.meta["marks"])
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as f: return json.load(f)
+        except FileNotFoundError:
+            return {"marks": {}, "parts": {k: [] for k in MIRROR_TABLES}, "synced_at": None}
+
+    def _write_part(self, key, df):
+        os.makedirs(self._path(key), exist_ok=True)
+        name = f"part-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = self._path(key, name + ".tmp")
+        df.to_parquet(tmp, index=False); os.replace(tmp, self._path(key, name))
+        return name
+
+    def _parts(self, key, columns=None, filters=None):
+        """Frame per part `key`: hanya `columns` dan baris yang lolos `filters` (ekspresi pyarrow) yang dimuat (pemanggil memegang lock)."""
+        import pyarrow.parquet as pq
+        for name in self.meta["parts"][key]:
+            yield pq.read_table(self._path(key, name), columns=columns, filters=filters, memory_map=True).to_pandas()
+
+    def _read(self, key, columns=None, filters=None):
+        """Gabungan `_parts` dengan tipe ringkas seperti cache ledger."""
+        frames = list(self._parts(key, columns, filters))
+        return concat_frames(key, frames) if frames else build_frames(_EMPTY_ROWS)[key]
+
+    def _ids(self, key, above=None):
+        """Id tersimpan di tabel `key`, opsional hanya yang > `above`."""
+        import pyarrow.dataset as ds
+        if key == "coa": return pd.Series([], dtype='int64')
+        return _ids(self._read(key, ['id'], None if above is None else ds.field('id') > above))
+
+    def _commit(self, meta):
+        """Tulis meta.json secara atomik lalu hapus part yang tidak lagi dirujuk."""
+        tmp = self._path("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(meta, f)
+        os.replace(tmp, self._path("meta.json"))
+        self.meta = meta
+        for key in MIRROR_TABLES:
+            if not os.path.isdir(self._path(key)): continue
+            for name in set(os.listdir(self._path(key))) - set(meta["parts"][key]):
+                try: os.remove(self._path(key, name))
+                except OSError: pass
+
+    def row_counts(self):
+        """Jumlah baris per tabel, dari metadata Parquet (tanpa membaca datanya)."""
+        import pyarrow.parquet as pq
+        with self._lock:
+            return {k: sum(pq.ParquetFile(self._path(k, p)).metadata.num_rows for p in self.meta["parts"][k]) for k in MIRROR_TABLES}
+
+    def overlap_ids(self, marks):
+        """Id per tabel ledger di jangkauan tumpang tindih bawah `marks` (lihat `LedgerCache.recent`)."""
+        after = overlap_after(marks)
+        with self._lock:
+            return {k: recent_ids(self._ids(k, after[k]).tolist(), marks.get(k)) for k in LEDGER_TABLES}
+
+    def append(self, rows, since):
+        """
+        Simpan baris hasil fetch delta (id > `since`, format `fetch_ledger_rows`)
+        yang belum ada di cermin sebagai part baru. Mengembalikan jumlah baris
+        baru, atau None tanpa menulis apa pun bila `since` tidak menjangkau
+        REFRESH_OVERLAP id di bawah mark cermin (ada celah) atau ada baris
+        jurnal yang jurnal induknya belum ada, agar `sync` berikutnya yang
+        menyusulkan.
+        """
+        import pyarrow.dataset as ds
+        with self._lock:
+            marks = self.meta["marks"]
+            if any(since.get(k) is not None and (marks.get(k) is None or since[k] > marks[k] - REFRESH_OVERLAP)
+                   for k in LEDGER_TABLES): return None
+            new = build_frames(rows)
+            for key in LEDGER_TABLES:
+                if not new[key].empty: new[key] = new[key][~new[key]['id'].isin(self._ids(key, since.get(key)))].reset_index(drop=True)
+            if not new["lines"].empty:
+                parents = new["lines"]['journal_id'].unique().tolist()
+                known = pd.concat([_ids(self._read("entries", ['id'], ds.field('id').isin(parents))), _ids(new["entries"])])
+                if not new["lines"]['journal_id'].isin(known).all(): return None
+
+            meta = {"marks": dict(marks), "parts": {k: list(v) for k, v in self.meta["parts"].items()}, "synced_at": time.time()}
+            for key in LEDGER_TABLES:
+                if new[key].empty: continue
+                meta["parts"][key].append(self._write_part(key, new[key]))
+                meta["marks"][key] = max(int(new[key]['id'].max()), meta["marks"].get(key) or 0)
+            if rows["coa"] and not new["coa"].equals(self._read("coa")):
+                meta["parts"]["coa"] = [self._write_part("coa", new["coa"])]
+            for key in LEDGER_TABLES:
+                # Kompaksi: satu-satunya saat seluruh tabel dibaca, dan hanya sementara
+                if len(meta["parts"][key]) > MAX_PARTS:
+                    meta["parts"][key] = [self._write_part(key, concat_frames(key, [self._read(key), new[key]]))]
+            self._commit(meta)
+            return sum(len(new[k]) for k in LEDGER_TABLES)
+
+    def sync(self, client, max_workers=MAX_WORKERS):
+        """Tarik baris baru dari server. Mengembalikan jumlah baris baru."""
+        since = overlap_after(self.marks)
+        # journal_lines diambil sebelum journal_entries, sehingga jurnal induk setiap baris pasti sudah ada
+        rows, _ = fetch_ledger_rows(client, tables={k: LEDGER_TABLES[k] for k in ("lines", "mov")}, max_workers=max_workers, after=since)
+        ent, _ = fetch_ledger_rows(client, tables={"entries": LEDGER_TABLES["entries"]}, max_workers=max_workers, after=since)
+        rows["entries"], rows["coa"] = ent["entries"], ent["coa"]
+        added = self.append(rows, since)
+        if added is None:
+            raise RuntimeError("Cermin ledger berubah saat sinkronisasi; ulangi sync")
+        return added
+
+    def window(self, start=None, end=None):
+        """
+        Data berbentuk `LedgerCache.data` untuk jurnal [start, end] (None = tanpa
+        batas), dihitung lokal dari cermin. Hanya jurnal jendela dan baris
+        jurnalnya yang dimuat; saldo awal diagregasi per part dari empat kolom
+        baris jurnal sebelum `start`. Mengembalikan (data, counts, marks).
+        """
+        start, end = _day(start), _day(end)
+        with self._lock:
+            try:
+                marks, ent, lines, opening, coa, mov = self._window(start, end)
+            except FileNotFoundError:
+                # Part baru saja dihapus kompaksi proses lain setelah meta.json dibaca: ulangi dengan meta terbaru
+                marks, ent, lines, opening, coa, mov = self._window(start, end)
+        dates = line_dates(lines, ent)
+        data = {
+            "entries": ent.reset_index(drop=True), "lines": lines.reset_index(drop=True), "coa": coa, "mov": mov,
+            "opening": opening, "window": (start, end), "index": BalanceIndex.build(lines, dates, opening),
+        }
+        counts = {k: {"fetched": len(data[k]), "expected": len(data[k])} for k in ("mov", "entries", "lines", "coa")}
+        return data, counts, {k: marks.get(k) for k in LEDGER_TABLES}
+
+    def _window(self, start, end):
+        """Bagian `window` yang membaca disk (pemanggil memegang lock)."""
+        import pyarrow.dataset as ds
+        # Cermin bisa ditulis proses lain (`python ledger_mirror.py sync`), jadi meta.json dibaca ulang
+        self.meta = self._read_meta()
+        marks = self.marks
+        ent = self._read("entries", filters=_date_filter(start, end))
+        lines = self._read("lines", filters=ds.field('journal_id').isin(_ids(ent).tolist()))
+        opening = opening_frame()
+        if start is not None:
+            before = _ids(self._read("entries", ['id'], ds.field('transaction_date') < start.to_pydatetime())).tolist()
+            for part in self._parts("lines", ['journal_id', 'account_code', 'debit_amount', 'credit_amount'], ds.field('journal_id').isin(before)):
+                opening = add_opening(opening, aggregate_lines(typed_frame("lines", part)))
+        return marks, ent, lines, opening, self._read("coa"), self._read("mov")
+
+
+def journal_frame(data):
+    """Baris jurnal jendela digabung dengan jurnal induk dan nama akunnya (untuk ekspor audit)."""
+    ent = data["entries"].rename(columns={'id': 'journal_id', 'description': 'description_entry'})
+    df = data["lines"].merge(ent, on='journal_id', suffixes=('_line', '_entry'))
+    if not data["coa"].empty:
+        df = df.merge(data["coa"][['account_code', 'account_name']].drop_duplicates('account_code'), on='account_code', how='left')
+    return df.sort_values(['transaction_date', 'journal_id'], kind='mergesort').reset_index(drop=True)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="ledger_mirror", description="Cermin Parquet lokal ledger Supabase")
+    p.add_argument("--dir", default=MIRROR_DIR or ".ledger_mirror", help="direktori cermin")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("sync", help="tarik baris baru dari Supabase")
+    sub.add_parser("info", help="ringkasan isi cermin")
+    ex = sub.add_parser("export", help="ekspor jurnal, saldo awal, COA, dan persediaan dari cermin (offline)")
+    ex.add_argument("--start"); ex.add_argument("--end")
+    ex.add_argument("--out", required=True, help="file tujuan (.xlsx, atau .zip untuk csv/parquet)")
+    ex.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    args = p.parse_args(argv)
+
+    mirror = LedgerMirror(args.dir)
+    if args.cmd == "sync":
+        from supabase_client import supabase
+        added = mirror.sync(supabase)
+        print(f"{added:,} baris baru disimpan ke {args.dir}")
+    elif args.cmd == "info":
+        counts, marks = mirror.row_counts(), mirror.marks
+        synced = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mirror.meta["synced_at"])) if mirror.exists else "belum pernah"
+        print(f"Cermin {args.dir} (sinkron terakhir: {synced})")
+        for key in MIRROR_TABLES:
+            print(f"  {key:8} {counts[key]:>10,} baris  {len(mirror.meta['parts'][key])} part  mark {marks.get(key)}")
+    elif args.cmd == "export":
+        if not mirror.exists: p.error(f"cermin {args.dir} kosong; jalankan sync dulu")
+        from report_export import WRITERS
+        data, _, _ = mirror.window(args.start, args.end)
+        reports = {"Jurnal": journal_frame(data), "Saldo Awal": data["opening"], "COA": data["coa"], "Persediaan": data["mov"]}
+        WRITERS[args.format](reports, args.out)
+        print(f"Ditulis ke {args.out}: " + ", ".join(f"{k} {len(v):,}" for k, v in reports.items()))
+
+
+if __name__ == "__main__":
+    main()
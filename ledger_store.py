@@ -0,0 +1,722 @@
+# ledger_store.py
+"""
+Pemuatan data akuntansi (jurnal, COA, pergerakan persediaan) dari Supabase.
+
+PostgREST membatasi jumlah baris per respons, sehingga `select("*")` tanpa
+batas akan memotong data secara diam-diam begitu tabel melewati batas itu.
+Modul ini membaca setiap tabel per halaman dengan rentang id (keyset),
+menjalankan halaman-halaman tersebut secara paralel, lalu menyusun ulang
+DataFrame yang dipakai laporan beserta jumlah baris yang berhasil diambil.
+
+Jurnal hanya diambil untuk rentang tanggal yang diminta (filter dan urutan
+`transaction_date` di server); saldo sebelum rentang itu datang dari satu
+RPC agregat `ledger_opening_balances`.
+
+`LedgerCache` menyimpan hasilnya di memori bersama high-water mark id per
+tabel, sehingga refresh berikutnya hanya mengambil baris yang lebih baru.
+`BalanceIndex` menyimpan kumulatif debit/kredit per akun menurut tanggal
+agar saldo per tanggal berapa pun cukup dicari dengan binary search.
+Dengan cermin Parquet lokal (`ledger_mirror`), start dingin dibaca dari
+disk dan disusulkan ke server di thread latar belakang.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Batas baris per respons PostgREST (default Supabase: 1000)
+PAGE_SIZE = 1000
+# Jumlah maksimum request yang berjalan bersamaan ke Supabase
+MAX_WORKERS = 8
+# Jurnal dengan id >= nilai ini adalah Jurnal Penyesuaian (AJP)
+ADJUSTING_JOURNAL_ID = 200
+# Delta diambil mulai sekian id di bawah high-water mark: id dibagikan saat insert, bukan
+# saat commit, jadi baris ber-id lebih kecil bisa baru terlihat setelah baris ber-id lebih
+# besar. Diasumsikan tidak ada transaksi yang masih terbuka setelah sekian id sesudahnya terpakai.
+REFRESH_OVERLAP = 1000
+
+ENTRY_SELECT = "id, transaction_date, description, order_id"
+# key hasil -> (tabel, kolom yang diambil). journal_lines membawa tanggal jurnalnya
+# agar baris baru dari refresh delta bisa dipilah menurut rentang tanggal cache.
+LEDGER_TABLES = {
+    "mov": ("inventory_movements", "*, products(name)"),
+    "lines": ("journal_lines", "*, journal_entries(transaction_date)"),
+    "entries": ("journal_entries", ENTRY_SELECT),
+}
+COA_TABLE = "chart_of_accounts"
+
+ENTRY_COLUMNS = ['id', 'transaction_date', 'description', 'order_id']
+# Tipe kolom per frame cache: id/kuantitas int32 (int64 bila melebihi batas), nominal int64
+# rupiah utuh (float64 hanya bila ada pecahan), tanggal datetime64, teks berulang categorical
+FRAME_TYPES = {
+    "entries": {"ints": ['id'], "dates": ['transaction_date']},
+    "lines": {"ints": ['id', 'journal_id'], "amounts": ['debit_amount', 'credit_amount'], "categories": ['account_code']},
+    "mov": {"ints": ['id', 'product_id', 'quantity_change'], "amounts": ['unit_cost'], "dates": ['movement_date'], "categories": ['product_name', 'movement_type']},
+}
+LINE_COLUMNS = ['journal_id', 'account_code', 'debit_amount', 'credit_amount']
+OPENING_COLUMNS = ['account_code', 'adjusting', 'debit_amount', 'credit_amount']
+
+
+# --- FETCHING ---
+def _id_bounds(client, table, after=None):
+    """
+    Mengembalikan (id terkecil, id terbesar, jumlah baris) sebuah tabel, opsional hanya id > after.
+    Id terbesar dibaca dulu, lalu id terkecil dan jumlah diambil dalam satu request yang
+    dibatasi id <= id terbesar itu, jadi baris yang masuk di antara kedua request tidak
+    ikut terhitung dan tidak memicu peringatan "tidak lengkap" palsu.
+    """
+    hi = _remote_max_id(client, table)
+    if hi is None or (after is not None and hi <= after):
+        return None, None, 0
+    q = client.table(table).select("id", count="exact").lte("id", hi).order("id").limit(1)
+    if after is not None: q = q.gt("id", after)
+    first = q.execute()
+    if not first.data:
+        return None, None, 0
+    return first.data[0]["id"], hi, first.count
+
+
+def _id_slices(lo, hi, n, page_size=PAGE_SIZE):
+    """
+    Potong lo..hi menjadi rentang [a, b) untuk diambil paralel. Banyaknya rentang
+    mengikuti jumlah baris `n`, bukan lebar id, agar id yang jarang tidak menghasilkan
+    satu request per rentang kosong; rentang yang lebih padat dari `page_size` tetap
+    dihabiskan oleh `_fetch_id_range`.
+    """
+    step = -(-(hi - lo + 1) // max(-(-n // page_size), 1))
+    return [(a, min(a + step, hi + 1)) for a in range(lo, hi + 1, step)]
+
+
+def _remote_max_id(client, table):
+    res = client.table(table).select("id").order("id", desc=True).limit(1).execute()
+    return res.data[0]["id"] if res.data else None
+
+
+def _fetch_id_range(client, table, columns, lo, hi, page_size=PAGE_SIZE):
+    """Ambil semua baris dengan lo <= id < hi, berurutan menurut id (keyset)."""
+    rows = []
+    while lo < hi:
+        page = (client.table(table).select(columns)
+                .gte("id", lo).lt("id", hi).order("id").limit(page_size).execute().data)
+        rows.extend(page)
+        # Halaman tidak penuh berarti rentang ini sudah habis
+        if len(page) < page_size: break
+        lo = page[-1]["id"] + 1
+    return rows
+
+
+def _fetch_keyset(client, table, columns, key, page_size=PAGE_SIZE):
+    """Ambil seluruh tabel berurutan menurut `key` (untuk tabel tanpa kolom id)."""
+    count = client.table(table).select(key, count="exact").limit(1).execute().count or 0
+    rows, last = [], None
+    while True:
+        q = client.table(table).select(columns).order(key).limit(page_size)
+        if last is not None: q = q.gt(key, last)
+        page = q.execute().data
+        rows.extend(page)
+        if len(page) < page_size: return rows, count
+        last = page[-1][key]
+
+
+def fetch_ledger_rows(client, tables=LEDGER_TABLES, max_workers=MAX_WORKERS, page_size=PAGE_SIZE, after=None):
+    """
+    Ambil seluruh baris tabel ledger secara paralel.
+    Setiap tabel dipecah menjadi rentang id berisi sekitar `page_size` baris, lalu
+    semua rentang dari semua tabel dijalankan pada satu pool thread yang terbatas.
+    Jika `after` (key -> id terakhir) diberikan, hanya baris dengan id lebih
+    besar yang diambil. Mengembalikan (rows per key, counts per key) dengan
+    counts berisi jumlah baris yang diambil dan jumlah baris menurut server.
+    """
+    after = after or {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        coa_job = pool.submit(_fetch_keyset, client, COA_TABLE, "*", "account_code", page_size)
+        bounds = {k: pool.submit(_id_bounds, client, t, after.get(k)) for k, (t, _) in tables.items()}
+
+        jobs, expected = {}, {}
+        for key, (table, columns) in tables.items():
+            lo, hi, expected[key] = bounds[key].result()
+            jobs[key] = [] if lo is None else [
+                pool.submit(_fetch_id_range, client, table, columns, a, b, page_size)
+                for a, b in _id_slices(lo, hi, expected[key], page_size)
+            ]
+
+        # Rentang dikirim berurutan, jadi hasil gabungan tetap terurut menurut id
+        rows = {key: [r for job in js for r in job.result()] for key, js in jobs.items()}
+        rows["coa"], expected["coa"] = coa_job.result()
+
+    counts = {key: {"fetched": len(rows[key]), "expected": expected[key]} for key in rows}
+    return rows, counts
+
+
+def _in_range(q, start, end, prefix=""):
+    """Filter `transaction_date` start <= tanggal <= end (None = tanpa batas)."""
+    if start is not None: q = q.gte(f"{prefix}transaction_date", str(start))
+    if end is not None: q = q.lt(f"{prefix}transaction_date", str(end + timedelta(days=1)))
+    return q
+
+
+def fetch_window(client, start=None, end=None, marks=None, max_workers=MAX_WORKERS, page_size=PAGE_SIZE):
+    """
+    Ambil jurnal dengan start <= transaction_date <= end beserta baris jurnalnya.
+    Filter dan urutan tanggal dijalankan di server, dan journal_lines di-embed
+    sehingga hanya baris milik jurnal yang cocok yang ikut terkirim. `marks`
+    membatasi id agar hasil konsisten dengan high-water mark cache.
+    Mengembalikan (entry_rows, line_rows, counts).
+    """
+    marks = marks or {}
+    max_ent, max_line = marks.get("entries"), marks.get("lines")
+
+    def entries_query(count=None):
+        q = _in_range(client.table("journal_entries").select(f"{ENTRY_SELECT}, journal_lines(*)", count=count), start, end)
+        if max_ent is not None: q = q.lte("id", max_ent)
+        if max_line is not None: q = q.lte("journal_lines.id", max_line)
+        return q.order("transaction_date").order("id").limit(page_size)
+
+    def entries_page(offset):
+        return entries_query().offset(offset).execute().data
+
+    def lines_count():
+        q = _in_range(client.table("journal_lines").select("id, journal_entries!inner(id)", count="exact"),
+                      start, end, "journal_entries.")
+        if max_ent is not None: q = q.lte("journal_entries.id", max_ent)
+        if max_line is not None: q = q.lte("id", max_line)
+        return q.limit(1).execute().count or 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        n_lines = pool.submit(lines_count)
+        first = entries_query("exact").execute()
+        # Himpunan baris sudah dibekukan oleh `marks`, jadi halaman offset aman diambil paralel
+        pages = [pool.submit(entries_page, a) for a in range(page_size, first.count or 0, page_size)]
+        entries = first.data + [r for p in pages for r in p.result()]
+        expected_lines = n_lines.result()
+    # Jurnal ber-id di bawah mark yang ter-commit terlambat masih bisa menggeser halaman: jurnal
+    # yang terdorong ke halaman berikutnya (beserta baris jurnalnya) hanya disimpan sekali
+    seen = set()
+    entries = [e for e in entries if not (e["id"] in seen or seen.add(e["id"]))]
+
+    lines = [ln for e in entries for ln in (e.pop("journal_lines", None) or [])]
+    counts = {"entries": {"fetched": len(entries), "expected": first.count or 0},
+              "lines": {"fetched": len(lines), "expected": expected_lines}}
+    return entries, lines, counts
+
+
+def _balance_rpc(client, fn, params, marks=None):
+    """Panggil RPC saldo agregat; hasil dibekukan pada high-water mark `marks`."""
+    marks = marks or {}
+    rows = client.rpc(fn, {
+        **params,
+        "p_max_entry_id": marks.get("entries"),
+        "p_max_line_id": marks.get("lines"),
+        "p_adjusting_from": ADJUSTING_JOURNAL_ID,
+    }).execute().data
+    return opening_frame(rows)
+
+
+def fetch_opening_balances(client, before, marks=None):
+    """Total debit/kredit per akun (dipisah umum vs penyesuaian) untuk semua jurnal sebelum `before`, dalam satu RPC agregat."""
+    return _balance_rpc(client, "ledger_opening_balances", {"p_before": str(before)}, marks)
+
+
+def fetch_trial_balance(client, end=None, start=None, marks=None):
+    """
+    Total debit/kredit per (akun, umum/penyesuaian) untuk jurnal start <= tanggal
+    <= end (None = tanpa batas), diagregasi di database lewat RPC
+    `ledger_trial_balance`: satu baris per akun, bukan seluruh baris jurnal.
+    """
+    return _balance_rpc(client, "ledger_trial_balance", {
+        "p_end": None if end is None else str(end), "p_start": None if start is None else str(start)}, marks)
+
+
+# --- FRAMES ---
+def _to_dates(values):
+    """Tanggal transaksi -> datetime64 tanpa timezone, dinormalisasi ke awal hari."""
+    dates = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce')
+    # Hapus timezone jika ada
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.dt.normalize()
+
+
+def _ints(values):
+    """int32 bila muat (int64 bila tidak); kolom yang punya nilai kosong dibiarkan."""
+    num = pd.to_numeric(values, errors='coerce')
+    if num.isna().any(): return values
+    if num.empty or (num.min() >= np.iinfo(np.int32).min and num.max() <= np.iinfo(np.int32).max): return num.astype(np.int32)
+    return num.astype(np.int64)
+
+
+def _amounts(values):
+    """Nominal rupiah: kosong = 0, int64 bila semua bulat, float64 bila ada pecahan (tidak dibulatkan diam-diam)."""
+    num = pd.to_numeric(values, errors='coerce').fillna(0)
+    if num.empty or ((num % 1 == 0).all() and num.abs().max() < 2 ** 53): return num.astype(np.int64)
+    return num.astype(np.float64)
+
+
+def typed_frame(key, df):
+    """Terapkan FRAME_TYPES[key] ke `df` (dipanggil ulang setelah concat agar tipe ringkas terjaga)."""
+    spec = FRAME_TYPES.get(key, {})
+    out = df.copy(deep=False)
+    for c in spec.get("ints", []):
+        if c in out.columns: out[c] = _ints(out[c])
+    for c in spec.get("amounts", []):
+        if c in out.columns: out[c] = _amounts(out[c])
+    for c in spec.get("dates", []):
+        if c in out.columns and not pd.api.types.is_datetime64_dtype(out[c]): out[c] = _to_dates(out[c]).values
+    for c in spec.get("categories", []):
+        if c in out.columns and not isinstance(out[c].dtype, pd.CategoricalDtype): out[c] = out[c].astype('category')
+    return out
+
+
+def concat_frames(key, frames):
+    """Gabung frame cache; kategori yang berbeda disatukan lalu tipe ringkas diterapkan ulang."""
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    if len(frames) == 1: return frames[0]
+    return typed_frame(key, pd.concat(frames, ignore_index=True))
+
+
+def build_frames(rows):
+    """Susun DataFrame laporan (bertipe ringkas, lihat FRAME_TYPES) dari baris mentah PostgREST."""
+    df_ent = pd.DataFrame(rows["entries"])
+    if df_ent.empty: df_ent = pd.DataFrame(columns=ENTRY_COLUMNS)
+
+    df_lines = pd.DataFrame(rows["lines"]).drop(columns=['journal_entries'], errors='ignore')
+    if df_lines.empty: df_lines = pd.DataFrame(columns=LINE_COLUMNS)
+
+    # Nama produk dari embed products(name) diratakan sekali di sini, bukan per laporan
+    df_mov = pd.DataFrame(rows["mov"])
+    if 'products' in df_mov.columns:
+        df_mov['product_name'] = [p.get('name') if isinstance(p, dict) else 'Unknown' for p in df_mov.pop('products')]
+
+    return {"lines": typed_frame("lines", df_lines), "entries": typed_frame("entries", df_ent),
+            "coa": pd.DataFrame(rows["coa"]), "mov": typed_frame("mov", df_mov)}
+
+
+def opening_frame(rows=None):
+    """Frame saldo awal: account_code, adjusting, debit_amount, credit_amount."""
+    df = pd.DataFrame(rows or [], columns=OPENING_COLUMNS)
+    df['adjusting'] = df['adjusting'].astype(bool)
+    df[['debit_amount', 'credit_amount']] = df[['debit_amount', 'credit_amount']].astype(float)
+    return df
+
+
+def aggregate_lines(lines, sign=1):
+    """Ringkas baris jurnal menjadi frame saldo awal (dikali `sign`)."""
+    if lines.empty: return opening_frame()
+    agg = (lines.assign(adjusting=lines['journal_id'] >= ADJUSTING_JOURNAL_ID)
+           .groupby(['account_code', 'adjusting'], as_index=False, observed=True)[['debit_amount', 'credit_amount']].sum())
+    agg[['debit_amount', 'credit_amount']] *= sign
+    return opening_frame(agg.to_dict('records'))
+
+
+def add_opening(opening, delta):
+    """Jumlahkan dua frame saldo awal per (akun, adjusting)."""
+    if delta.empty: return opening
+    if opening.empty: return delta
+    both = pd.concat([opening, delta], ignore_index=True)
+    agg = both.groupby(['account_code', 'adjusting'], as_index=False)[['debit_amount', 'credit_amount']].sum()
+    # Akun yang habis dikurangi (mis. saat jendela diperluas ke belakang) tidak perlu baris saldo awal
+    agg = agg[(agg[['debit_amount', 'credit_amount']].abs() >= 0.005).any(axis=1)]
+    return opening_frame(agg.to_dict('records'))
+
+
+def opening_balance(data, start):
+    """Saldo awal per akun pada `start` (saldo s.d. sehari sebelumnya), dibaca dari indeks saldo."""
+    floor = data["window"][0]
+    if start is None or (floor is not None and pd.Timestamp(start) <= floor):
+        return data["opening"]
+    return data["index"].as_of(pd.Timestamp(start) - timedelta(days=1))
+
+
+def line_dates(lines, entries):
+    """Tanggal transaksi setiap baris jurnal, diambil dari jurnal induknya (NaT bila induk tidak ada)."""
+    if lines.empty: return pd.Series([], dtype='datetime64[ns]')
+    return lines['journal_id'].map(entries.set_index('id')['transaction_date']) if not entries.empty \
+        else pd.Series(pd.NaT, index=lines.index, dtype='datetime64[ns]')
+
+
+# --- BALANCE INDEX ---
+def _daily(lines, dates):
+    """Total debit/kredit per (akun, adjusting, tanggal), terurut per kunci lalu tanggal."""
+    ok = dates.notna().to_numpy()
+    df = pd.DataFrame({
+        'account_code': lines['account_code'].to_numpy()[ok],
+        'adjusting': (lines['journal_id'].to_numpy()[ok] >= ADJUSTING_JOURNAL_ID),
+        'date': pd.to_datetime(dates[ok]).to_numpy(),
+        'debit_amount': lines['debit_amount'].to_numpy(dtype=float)[ok],
+        'credit_amount': lines['credit_amount'].to_numpy(dtype=float)[ok],
+    })
+    return df.groupby(['account_code', 'adjusting', 'date'], sort=True)[['debit_amount', 'credit_amount']].sum().reset_index()
+
+
+def _series(daily):
+    """{(akun, adjusting): (tanggal, kumulatif debit, kumulatif kredit)} dari frame `_daily`."""
+    out = {}
+    for key, g in daily.groupby(['account_code', 'adjusting'], sort=False):
+        out[key] = (g['date'].to_numpy(), g['debit_amount'].to_numpy().cumsum(), g['credit_amount'].to_numpy().cumsum())
+    return out
+
+
+class BalanceIndex:
+    """
+    Indeks saldo per (akun, umum/penyesuaian) untuk jurnal di jendela cache.
+
+    Setiap kunci menyimpan tanggal unik terurut beserta kumulatif debit dan
+    kredit hingga tanggal itu, ditambah saldo dasar (saldo awal sebelum jendela).
+    Saldo per tanggal cukup dicari dengan binary search, bukan menjumlah ulang
+    seluruh baris. Objek tidak diubah setelah dibuat: `extended`/`with_base`
+    mengembalikan indeks baru yang berbagi array kunci yang tidak berubah,
+    sehingga snapshot lama tetap konsisten.
+    """
+
+    def __init__(self, series=None, base=None):
+        self.series = series or {}
+        self.base = base or {}
+
+    @classmethod
+    def build(cls, lines, dates, opening=None):
+        return cls(_series(_daily(lines, dates))).with_base(opening)
+
+    def with_base(self, opening):
+        """Indeks yang sama dengan saldo dasar diganti `opening` (frame saldo awal)."""
+        base = {}
+        if opening is not None:
+            for code, adj, d, c in opening[OPENING_COLUMNS].itertuples(index=False, name=None):
+                b = base.get((code, bool(adj)), (0.0, 0.0)); base[(code, bool(adj))] = (b[0] + d, b[1] + c)
+        return BalanceIndex(self.series, base)
+
+    def extended(self, lines, dates):
+        """Indeks baru yang memuat `lines` tambahan; kunci yang tidak tersentuh dipakai bersama."""
+        if lines.empty: return self
+        series = dict(self.series)
+        for key, (nd, cd, cc) in _series(_daily(lines, dates)).items():
+            old = series.get(key)
+            if old is None:
+                series[key] = (nd, cd, cc)
+            elif nd[0] > old[0][-1]:
+                # Kasus umum: baris baru bertanggal sesudah semua baris lama -> cukup disambung
+                series[key] = (np.concatenate([old[0], nd]), np.concatenate([old[1], cd + old[1][-1]]), np.concatenate([old[2], cc + old[2][-1]]))
+            else:
+                # Jurnal mundur tanggal: gabung ulang mutasi harian kunci ini saja
+                dates_all = np.concatenate([old[0], nd])
+                d_all = np.concatenate([np.diff(old[1], prepend=0.0), np.diff(cd, prepend=0.0)])
+                c_all = np.concatenate([np.diff(old[2], prepend=0.0), np.diff(cc, prepend=0.0)])
+                uniq, inv = np.unique(dates_all, return_inverse=True)
+                d_sum = np.zeros(len(uniq)); c_sum = np.zeros(len(uniq))
+                np.add.at(d_sum, inv, d_all); np.add.at(c_sum, inv, c_all)
+                series[key] = (uniq, d_sum.cumsum(), c_sum.cumsum())
+        return BalanceIndex(series, self.base)
+
+    def as_of(self, date=None):
+        """Saldo debit/kredit kumulatif per (akun, adjusting) s.d. `date` (inklusif; None = semua), dalam bentuk frame saldo awal."""
+        t = None if date is None else np.datetime64(pd.Timestamp(date).normalize())
+        rows = []
+        for key in self.series.keys() | self.base.keys():
+            d, c = self.base.get(key, (0.0, 0.0))
+            if key in self.series:
+                dates, cd, cc = self.series[key]
+                pos = len(dates) if t is None else np.searchsorted(dates, t, side='right')
+                if pos: d += cd[pos - 1]; c += cc[pos - 1]
+            if abs(d) >= 0.005 or abs(c) >= 0.005: rows.append((key[0], key[1], d, c))
+        return opening_frame([dict(zip(OPENING_COLUMNS, r)) for r in rows])
+
+    def movement(self, start, end):
+        """Mutasi debit/kredit per (akun, adjusting) untuk tanggal [start, end]."""
+        a = self.as_of(end).set_index(['account_code', 'adjusting'])
+        b = self.as_of(pd.Timestamp(start) - timedelta(days=1)).set_index(['account_code', 'adjusting'])
+        return a.sub(b, fill_value=0.0).reset_index()
+
+
+def truncated_tables(counts):
+    """Daftar key tabel yang jumlah baris terambilnya tidak sama dengan jumlah di server."""
+    return [k for k, c in counts.items() if c["fetched"] != c["expected"]]
+
+
+def _max_id(rows, current=None):
+    ids = [r["id"] for r in rows if r.get("id") is not None]
+    if not ids: return current
+    return max(ids) if current is None else max(max(ids), current)
+
+
+def overlap_after(marks):
+    """Batas `after` untuk fetch delta: REFRESH_OVERLAP id di bawah mark setiap tabel ledger."""
+    return {k: None if marks.get(k) is None else marks[k] - REFRESH_OVERLAP for k in LEDGER_TABLES}
+
+
+def recent_ids(ids, mark):
+    """Id yang masih di dalam jangkauan tumpang tindih di bawah `mark`."""
+    if mark is None: return set()
+    return {i for i in ids if mark - REFRESH_OVERLAP < i <= mark}
+
+
+def _add_counts(a, b):
+    return {k: {c: a.get(k, {}).get(c, 0) + b[k][c] for c in ("fetched", "expected")} for k in b}
+
+
+def _day(value):
+    return None if value is None else pd.Timestamp(value).normalize()
+
+
+class LedgerCache:
+    """
+    Cache ledger di memori yang disinkronkan secara inkremental.
+
+    Jurnal hanya disimpan untuk jendela tanggal [floor, ceil] yang pernah
+    diminta, ditambah saldo awal per akun sebelum `floor`. Jendela melebar
+    otomatis bila laporan meminta rentang di luarnya. Menyimpan id terakhir
+    (high-water mark) per tabel; `refresh()` hanya mengambil baris dengan id
+    di atas mark dikurangi REFRESH_OVERLAP, membuang id yang sudah diterapkan
+    (`recent`), lalu menambahkannya ke jendela atau melipatnya ke saldo awal.
+    Dengan begitu baris yang ter-commit terlambat dengan id di bawah mark
+    tetap tersusul. Ledger diasumsikan append-only (jurnal koreksi dicatat
+    sebagai jurnal baru, bukan edit baris lama).
+
+    Bila `mirror` (LedgerMirror) diberikan, cache kosong diisi dari cermin
+    lokal lalu `reconcile()` menyusulkannya ke server di latar belakang;
+    baris baru dari refresh ikut ditulis ke cermin. Tanpa `client`, cache
+    bekerja offline sepenuhnya dari cermin.
+    """
+
+    def __init__(self, client, max_workers=MAX_WORKERS, mirror=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.mirror = mirror
+        # "mirror" selama data belum disusulkan ke server, "server" sesudahnya
+        self.source = None
+        self.sync_error = None
+        self._sync = None
+        self.data = {}
+        self.marks = {}
+        # Id per tabel di jangkauan tumpang tindih bawah mark yang sudah diterapkan
+        self.recent = {}
+        self.counts = {}
+        # Naik setiap kali isi ledger berubah; dipakai sebagai kunci memo laporan
+        self.version = 0
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        return self.data.get("window", (None, None))
+
+    def load(self, start=None, end=None):
+        """Muat ulang cache untuk jendela [start, end] (None = tanpa batas)."""
+        with self._lock:
+            self._load(_day(start), _day(end))
+        return self
+
+    def load_local(self, start=None, end=None):
+        """Isi cache dari cermin lokal tanpa jaringan; mark ikut dari cermin, jadi refresh() cukup menyusulkan selisihnya."""
+        with self._lock:
+            data, counts, self.marks = self.mirror.window(_day(start), _day(end))
+            self.recent = self.mirror.overlap_ids(self.marks)
+            self.source = "mirror"
+            self._store(data, counts, True)
+        return self
+
+    @property
+    def syncing(self):
+        return self._sync is not None and self._sync.is_alive()
+
+    def reconcile(self):
+        """Susulkan cache (bila dari cermin) dan cermin ke server di thread latar belakang; no-op bila masih berjalan."""
+        if self.client is None or self.syncing: return
+        self._sync = threading.Thread(target=self._reconcile, name="ledger-sync", daemon=True)
+        self._sync.start()
+
+    def _reconcile(self):
+        try:
+            if self.source == "mirror": self.refresh()
+            if self.mirror is not None: self.mirror.sync(self.client, self.max_workers)
+            self.sync_error = None
+        except Exception as e:
+            self.sync_error = e
+
+    def refresh(self):
+        """Ambil hanya baris baru sejak sinkronisasi terakhir. Mengembalikan jumlah baris baru."""
+        if self.client is None: return self._reload_local()
+        with self._lock:
+            # Belum ada jendela yang dimuat; snapshot() berikutnya akan memuatnya
+            if not self.data: return 0
+            rows, after, added = self._refresh()
+        # Delta yang sama ditambahkan ke cermin; bila ada celah, sync() berikutnya yang menyusulkan
+        if self.mirror is not None: self.mirror.append(rows, after)
+        return added
+
+    def _refresh(self, after=None):
+        """
+        Ambil baris dengan id > `after` (default: mark dikurangi REFRESH_OVERLAP)
+        dan terapkan yang belum pernah diterapkan. Pemanggil memegang lock.
+        Mengembalikan (baris mentah, after, jumlah baris baru).
+        """
+        after = overlap_after(self.marks) if after is None else after
+        rows, counts = fetch_ledger_rows(self.client, max_workers=self.max_workers, after=after)
+        fresh = {k: [r for r in rows[k] if r.get("id") not in self.recent.get(k, ())] for k in LEDGER_TABLES}
+        for key in LEDGER_TABLES:
+            # Baris tumpang tindih yang sudah ada tidak dihitung ulang di jumlah baris
+            dup = len(rows[key]) - len(fresh[key])
+            counts[key] = {"fetched": counts[key]["fetched"] - dup, "expected": counts[key]["expected"] - dup}
+            self.marks[key] = _max_id(rows[key], self.marks.get(key))
+            self.recent[key] = recent_ids(self.recent.get(key, set()) | {r["id"] for r in fresh[key]}, self.marks[key])
+        added = sum(len(fresh[k]) for k in LEDGER_TABLES)
+
+        floor, ceil = self.window
+        new = build_frames({**fresh, "coa": rows["coa"]})
+        ent = new["entries"]
+        new["entries"] = ent[self._inside(ent['transaction_date'])] if not ent.empty else ent
+
+        # Baris baru dipilah menurut tanggal jurnalnya: dalam jendela ditambahkan,
+        # sebelum jendela dilipat ke saldo awal, sesudah jendela diabaikan
+        dates = _to_dates([(r.get("journal_entries") or {}).get("transaction_date") for r in fresh["lines"]])
+        lines = new["lines"]
+        opening, index = self.data["opening"], self.data["index"]
+        if not lines.empty:
+            inside = self._inside(dates).values
+            if floor is not None:
+                opening = add_opening(opening, aggregate_lines(lines[(dates < floor).values]))
+            new["lines"] = lines[inside]
+            index = index.extended(new["lines"], dates[inside]).with_base(opening)
+
+        # COA kecil, jadi selalu diambil ulang penuh; tabel ledger cukup ditambah barisnya
+        data = {"coa": new["coa"], "opening": opening, "window": (floor, ceil), "index": index}
+        for key in LEDGER_TABLES:
+            data[key] = concat_frames(key, [self.data[key], new[key]])
+        changed = added > 0 or not new["coa"].equals(self.data["coa"])
+        self.source = "server"
+        # COA diambil ulang penuh, jadi jumlahnya diganti, bukan ditambahkan
+        self._store(data, {**_add_counts(self.counts, counts), "coa": counts["coa"]}, changed)
+        return rows, after, added
+
+    def _reload_local(self):
+        """Refresh mode offline: baca ulang jendela dari cermin, termasuk part yang ditulis proses lain (`python ledger_mirror.py sync`)."""
+        with self._lock:
+            if not self.data: return 0
+            before = len(self.data["lines"]) + len(self.data["entries"]) + len(self.data["mov"])
+            data, counts, marks = self.mirror.window(*self.window)
+            changed = marks != self.marks
+            self.marks = marks
+            self._store(data, counts, changed)
+        return len(data["lines"]) + len(data["entries"]) + len(data["mov"]) - before
+
+    def snapshot(self, start=None, end=None, max_age=None):
+        """
+        Kembalikan salinan dangkal frame ledger (aman untuk diubah pemanggil)
+        yang mencakup jurnal [start, end]. Jika `max_age` (detik) diberikan dan
+        sinkronisasi terakhir lebih tua, lakukan refresh delta dulu.
+        """
+        start, end = _day(start), _day(end)
+        if not self.data:
+            if self.mirror is not None and (self.mirror.exists or self.client is None): self.load_local(start, end)
+            else: self.load(start, end)
+            # Cermin disusulkan (atau dibuat pertama kali) tanpa menahan laporan pertama
+            if self.mirror is not None: self.reconcile()
+        elif max_age is not None:
+            self.sync(max_age)
+        self._extend(start, end)
+        data, counts = self.data, self.counts
+        snap = {k: (v.copy(deep=False) if isinstance(v, pd.DataFrame) else v) for k, v in data.items()}
+        snap["counts"] = dict(counts)
+        return snap
+
+    def balances(self, end=None):
+        """
+        Saldo kumulatif per (akun, adjusting) s.d. `end`. Bila jendela cache
+        mencakup `end`, dibaca dari indeks saldo; selain itu (termasuk selama
+        cache belum dimuat) cukup satu RPC agregat tanpa memuat atau
+        memperlebar jendela. Hasil RPC dibekukan pada mark cache bila ada.
+        """
+        end = _day(end)
+        if self.client is None or (self.data and self._covers(end)):
+            return self.snapshot(end, end)["index"].as_of(end)
+        with self._lock: marks = dict(self.marks) if self.data else None
+        return fetch_trial_balance(self.client, end and end.date(), marks=marks)
+
+    def chart(self):
+        """COA dari cache; selama cache belum dimuat diambil langsung (tabel kecil) tanpa jurnal."""
+        if self.data or self.client is None: return self.data.get("coa", pd.DataFrame())
+        rows, _ = _fetch_keyset(self.client, COA_TABLE, "*", "account_code")
+        return pd.DataFrame(rows)
+
+    def sync(self, max_age):
+        """Refresh delta bila cache sudah dimuat dan sinkronisasi terakhir lebih tua dari `max_age` detik."""
+        if self.data and time.time() - self.synced_at > max_age: self.refresh()
+
+    def _covers(self, end):
+        floor, ceil = self.window
+        if end is None: return ceil is None
+        return (floor is None or end >= floor - timedelta(days=1)) and (ceil is None or end <= ceil)
+
+    def _inside(self, dates):
+        floor, ceil = self.window
+        mask = dates.notna()
+        if floor is not None: mask &= dates >= floor
+        if ceil is not None: mask &= dates <= ceil
+        return mask
+
+    def _load(self, start, end):
+        # Id terakhir baris jurnal dibaca sebelum id terakhir jurnal: jurnal ber-id di atas
+        # `top` pasti disisipkan sesudahnya, jadi baris-barisnya ber-id di atas batas baris
+        top_lines = _remote_max_id(self.client, LEDGER_TABLES["lines"][0])
+        top = _remote_max_id(self.client, LEDGER_TABLES["entries"][0])
+        # Jurnal dibekukan pada id terakhirnya agar halaman offset jendela tidak bergeser oleh jurnal
+        # yang masuk selama pemuatan. Baris jurnal (dan saldo awal) dibekukan REFRESH_OVERLAP id di
+        # bawah id terakhirnya (semua baris di bawahnya dianggap sudah ter-commit); sisanya, dan
+        # jurnal yang ter-commit terlambat, diambil sebagai delta di bawah
+        self.marks = {"entries": top, "lines": None if top_lines is None else top_lines - REFRESH_OVERLAP}
+        rows = {"entries": [], "lines": [], "coa": [], "mov": []}
+        rows["entries"], rows["lines"], window_counts = fetch_window(
+            self.client, start and start.date(), end and end.date(), self.marks, max_workers=self.max_workers)
+        # Jurnal di jangkauan tumpang tindih yang sudah terambil dicatat agar delta tidak menambahkannya lagi
+        self.recent = {"entries": recent_ids({r["id"] for r in rows["entries"]}, top)}
+        data = build_frames(rows)
+        data["opening"] = opening_frame() if start is None else fetch_opening_balances(self.client, start.date(), self.marks)
+        data["window"] = (start, end)
+        data["index"] = BalanceIndex.build(data["lines"], line_dates(data["lines"], data["entries"]), data["opening"])
+        self._store(data, window_counts, True)
+        # Persediaan dan COA dimuat penuh lewat delta yang sama (mark persediaan masih kosong)
+        self._refresh(after={**overlap_after({"entries": top}), "lines": self.marks["lines"], "mov": None})
+
+    def _extend(self, start, end):
+        """Lebarkan jendela agar mencakup [start, end]; hanya selisih tanggalnya yang diambil."""
+        with self._lock:
+            floor, ceil = self.window
+            # (dari, sampai, sebelum_floor)
+            gaps = []
+            if floor is not None and (start is None or start < floor):
+                gaps.append((start, floor - timedelta(days=1), True))
+            if ceil is not None and (end is None or end > ceil):
+                gaps.append((ceil + timedelta(days=1), end, False))
+            if not gaps: return
+            window = (None if floor is None or start is None else min(start, floor),
+                      None if ceil is None or end is None else max(end, ceil))
+            if self.client is None:
+                self.data, self.counts, _ = self.mirror.window(*window)
+                return
+
+            data, counts = dict(self.data), self.counts
+            for lo, hi, before_floor in gaps:
+                ent, lines, c = fetch_window(self.client, lo and lo.date(), hi and hi.date(), self.marks, max_workers=self.max_workers)
+                new = build_frames({"entries": ent, "lines": lines, "coa": [], "mov": []})
+                data["entries"] = concat_frames("entries", [data["entries"], new["entries"]])
+                data["lines"] = concat_frames("lines", [data["lines"], new["lines"]])
+                counts = _add_counts(counts, c)
+                # Baris tumpang tindih yang ter-commit terlambat belum pernah dilipat ke saldo awal;
+                # kini sudah diterapkan, jadi dicatat agar refresh tidak menerapkannya lagi
+                late = np.zeros(len(new["lines"]), dtype=bool)
+                for key, fetched in (("entries", ent), ("lines", lines)):
+                    ids = recent_ids({r["id"] for r in fetched}, self.marks.get(key)) - self.recent.get(key, set())
+                    if key == "lines" and ids: late = new["lines"]['id'].isin(ids).to_numpy()
+                    self.recent[key] = self.recent.get(key, set()) | ids
+                # Baris yang kini masuk jendela dikeluarkan dari saldo awal
+                if before_floor:
+                    data["opening"] = opening_frame() if lo is None else add_opening(data["opening"], aggregate_lines(new["lines"][~late], sign=-1))
+                data["index"] = data["index"].extended(new["lines"], line_dates(new["lines"], new["entries"])).with_base(data["opening"])
+            data["window"] = window
+            self.data, self.counts = data, counts
+
+    def _store(self, data, counts, changed):
+        self.data = data
+        self.counts = counts
+        if changed: self.version += 1
+        self.synced_at = time.time()
@@ -0,0 +1,316 @@
+# notification_queue.py
+"""
+Antrean notifikasi Midtrans yang tahan restart (SQLite) beserta pool worker-nya.
+
+Webhook cukup menyimpan notifikasi ke antrean lalu langsung membalas 200;
+pencatatan jurnal dan update status order dikerjakan worker di latar
+belakang. Notifikasi yang sudah dibalas tidak hilang saat proses mati karena
+sudah tersimpan (commit + fsync) sebelum respons dikirim.
+
+Worker mengambil notifikasi dengan lease: baris `processing` yang lease-nya
+habis (worker/proses mati di tengah jalan) otomatis diambil ulang, jadi tidak
+perlu sapuan saat start dan aman untuk beberapa proses yang berbagi file yang
+sama. Notifikasi untuk order yang sama diproses berurutan (FIFO per order),
+satu per satu, agar status akhir order mengikuti urutan kedatangan.
+
+Kegagalan sementara (exception: Supabase mati, timeout jaringan) diulang dengan
+backoff yang dibatasi MAX_BACKOFF selama RETRY_HOURS jam waktu percobaan; webhook
+sudah membalas 200 sehingga Midtrans tidak akan mengirim ulang, jadi gangguan
+yang lama pun tidak boleh menjatuhkan notifikasi. Hanya hasil error yang pasti
+(mis. order tidak ditemukan) atau budget yang habis yang menjadi `failed`;
+jumlahnya terlihat di metrik webhook_queue_depth{state="failed"} dan barisnya bisa
+diantrekan ulang dengan `python notification_queue.py redrive`.
+
+Notifikasi yang sudah diproses dicatat per (order, transaction_id, status) di
+tabel `processed`, dengan LRU di memori di depannya (ProcessedNotifications),
+sehingga kiriman ulang Midtrans berhenti sebelum menyentuh Supabase.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+QUEUE_PATH = os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.sqlite3")
+# Lama (detik) sebuah notifikasi dipegang worker sebelum dianggap macet dan diambil ulang
+LEASE_SECONDS = 300
+# Notifikasi selesai disimpan sekian hari untuk jejak audit, lalu dihapus
+KEEP_DONE_DAYS = 7
+# Catatan idempotensi disimpan lebih lama dari jendela kirim ulang Midtrans
+KEEP_PROCESSED_DAYS = 90
+PROCESSED_CACHE_SIZE = int(os.getenv("WEBHOOK_IDEMPOTENCY_CACHE", "10000"))
+# Jeda maksimum (detik) antar percobaan ulang kegagalan sementara
+MAX_BACKOFF = 300
+# Lama (jam, dijumlah dari jeda backoff) kegagalan sementara terus diulang sebelum `failed`
+RETRY_HOURS = float(os.getenv("WEBHOOK_QUEUE_RETRY_HOURS", "24"))
+
+SCHEMA = """
+create table if not exists notifications (
+    id integer primary key autoincrement,
+    order_id integer not null,
+    transaction_status text,
+    transaction_id text,
+    payload text not null,
+    state text not null default 'queued',   -- queued | processing | done | failed
+    attempts integer not null default 0,
+    available_at real not null,
+    lease_until real,
+    last_error text,
+    received_at real not null,
+    updated_at real not null
+);
+create index if not exists notifications_claim_idx on notifications (state, available_at);
+create index if not exists notifications_order_idx on notifications (order_id, state);
+create table if not exists processed (
+    order_id integer not null,
+    transaction_id text not null,
+    status text not null,
+    journal_id integer,
+    processed_at real not null,
+    primary key (order_id, transaction_id, status)
+);
+"""
+
+CLAIM_SQL = """
+select id from notifications n
+where ((n.state = 'queued' and n.available_at <= :now) or (n.state = 'processing' and n.lease_until < :now))
+  and n.id = (select min(id) from notifications q where q.order_id = n.order_id and q.state in ('queued', 'processing'))
+  and not exists (select 1 from notifications p where p.order_id = n.order_id and p.state = 'processing' and p.lease_until >= :now)
+order by n.id limit 1
+"""
+
+# Koneksi yang diwarisi dari proses induk; dipegang agar tidak ditutup garbage collector
+_inherited = []
+
+
+class NotificationQueue:
+    """Antrean di satu file SQLite (WAL); satu koneksi per thread (dan per proses setelah fork)."""
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        self._local = threading.local()
+        # Koneksi pembuat skema langsung ditutup: di server dengan preload, konstruktor ini
+        # berjalan di master, dan koneksi yang masih terbuka akan diwarisi worker hasil fork
+        con = self._connect()
+        try: con.executescript(SCHEMA)
+        finally: con.close()
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("pragma journal_mode=wal")
+        # FULL: notifikasi yang sudah dibalas 200 harus tetap ada walau mesin mati
+        con.execute("pragma synchronous=full")
+        return con
+
+    def _conn(self):
+        con = getattr(self._local, "con", None)
+        # Koneksi SQLite tidak boleh dipakai lintas fork (server multi-worker dengan preload)
+        if con is None or self._local.pid != os.getpid():
+            if con is not None:
+                # Koneksi warisan fork tidak boleh ditutup: menutup fd-nya melepas lock POSIX
+                # proses ini, termasuk milik koneksi baru. Cukup ditinggalkan
+                _inherited.append(con)
+            con = self._connect()
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def put(self, order_id, transaction_status, transaction_id, payload):
+        """Simpan notifikasi; mengembalikan id antreannya."""
+        now = time.time()
+        cur = self._conn().execute(
+            "insert into notifications (order_id, transaction_status, transaction_id, payload, available_at, received_at, updated_at)"
+            " values (?, ?, ?, ?, ?, ?, ?)",
+            (order_id, transaction_status, transaction_id, json.dumps(payload), now, now, now))
+        return cur.lastrowid
+
+    def claim(self, lease=LEASE_SECONDS):
+        """Ambil satu notifikasi yang siap diproses (atau None) dan pegang dengan lease."""
+        con = self._conn(); now = time.time()
+        con.execute("begin immediate")
+        try:
+            row = con.execute(CLAIM_SQL, {"now": now}).fetchone()
+            if row is None:
+                con.execute("commit"); return None
+            con.execute("update notifications set state = 'processing', attempts = attempts + 1, lease_until = ?, updated_at = ? where id = ?",
+                        (now + lease, now, row["id"]))
+            job = dict(con.execute("select * from notifications where id = ?", (row["id"],)).fetchone())
+            con.execute("commit")
+            return job
+        except BaseException:
+            con.execute("rollback"); raise
+
+    def finish(self, job_id, error=None):
+        """Tandai selesai (`done`), atau `failed` tanpa diulang bila `error` diberikan."""
+        self._conn().execute("update notifications set state = ?, last_error = ?, lease_until = null, updated_at = ? where id = ?",
+                             ("failed" if error else "done", error, time.time(), job_id))
+
+    def retry(self, job_id, error, delay, give_up=False):
+        """Jadwalkan ulang setelah `delay` detik, atau `failed` bila `give_up`."""
+        now = time.time()
+        self._conn().execute("update notifications set state = ?, available_at = ?, last_error = ?, lease_until = null, updated_at = ? where id = ?",
+                             ("failed" if give_up else "queued", now + delay, error, now, job_id))
+
+    def redrive(self, ids=None):
+        """Antrekan ulang notifikasi `failed` (semua, atau hanya `ids`) dengan hitungan percobaan baru. Mengembalikan jumlahnya."""
+        now = time.time()
+        sql = "update notifications set state = 'queued', attempts = 0, available_at = ?, lease_until = null, updated_at = ? where state = 'failed'"
+        if ids: sql += " and id in (%s)" % ",".join("?" * len(ids))
+        return self._conn().execute(sql, (now, now, *(ids or []))).rowcount
+
+    def counts(self):
+        """Jumlah notifikasi per state."""
+        return dict(self._conn().execute("select state, count(*) from notifications group by state").fetchall())
+
+    def is_processed(self, key):
+        """Apakah notifikasi dengan kunci (order_id, transaction_id, status) sudah pernah diproses."""
+        return self._conn().execute("select 1 from processed where order_id = ? and transaction_id = ? and status = ?", key).fetchone() is not None
+
+    def mark_processed(self, key, journal_id=None):
+        self._conn().execute("insert or ignore into processed (order_id, transaction_id, status, journal_id, processed_at) values (?, ?, ?, ?, ?)",
+                             (*key, journal_id, time.time()))
+
+    def prune(self, days=KEEP_DONE_DAYS, processed_days=KEEP_PROCESSED_DAYS):
+        """Hapus notifikasi `done` yang lebih tua dari `days` hari dan catatan idempotensi yang lebih tua dari `processed_days`."""
+        now = time.time()
+        self._conn().execute("delete from notifications where state = 'done' and updated_at < ?", (now - days * 86400,))
+        self._conn().execute("delete from processed where processed_at < ?", (now - processed_days * 86400,))
+
+
+class ProcessedNotifications:
+    """
+    Catatan idempotensi: LRU di memori (tanpa I/O, untuk jalur cepat webhook)
+    di depan tabel `processed` yang tahan restart. Kunci: (order_id, transaction_id, status).
+    """
+
+    def __init__(self, queue, size=PROCESSED_CACHE_SIZE):
+        self.queue, self.size = queue, size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key):
+        with self._lock:
+            self._lru[key] = True; self._lru.move_to_end(key)
+            while len(self._lru) > self.size: self._lru.popitem(last=False)
+
+    def cached(self, key):
+        """Cek LRU saja."""
+        with self._lock:
+            if key not in self._lru: return False
+            self._lru.move_to_end(key); return True
+
+    def seen(self, key):
+        """Cek LRU, lalu catatan persisten (hit dimasukkan ke LRU)."""
+        if self.cached(key): return True
+        if not self.queue.is_processed(key): return False
+        self._remember(key); return True
+
+    def add(self, key, journal_id=None):
+        self.queue.mark_processed(key, journal_id)
+        self._remember(key)
+
+
+class QueueWorkers:
+    """
+    Thread worker yang menguras antrean dengan `handler(job)`. Pengecualian
+    dari handler dianggap sementara dan diulang dengan backoff (paling lama
+    MAX_BACKOFF) sampai jumlah jedanya melewati `retry_hours` jam; hasil
+    `{"status": "error", ...}` dicatat sebagai `failed` tanpa diulang.
+    """
+
+    def __init__(self, queue, handler, workers=4, retry_hours=RETRY_HOURS, poll=1.0):
+        self.queue, self.handler = queue, handler
+        self.workers, self.retry_hours, self.poll = workers, retry_hours, poll
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._drain = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear(); self._drain.clear()
+        self._threads = [threading.Thread(target=self._run, name=f"queue-worker-{i}", daemon=True) for i in range(self.workers)]
+        for t in self._threads: t.start()
+        return self
+
+    def notify(self):
+        """Bangunkan worker setelah notifikasi baru masuk (tanpa menunggu polling)."""
+        self._wake.set()
+
+    @property
+    def running(self):
+        """Semua thread worker hidup dan belum diminta berhenti."""
+        return (bool(self._threads) and not self._stop.is_set() and not self._drain.is_set()
+                and all(t.is_alive() for t in self._threads))
+
+    def stop(self, timeout=None, drain=False):
+        """
+        Berhenti mengambil notifikasi baru dan tunggu notifikasi yang sedang
+        diproses selesai, paling lama `timeout` detik untuk semua thread.
+        Dengan `drain`, worker lebih dulu menghabiskan notifikasi yang sudah
+        siap di antrean (yang masih menunggu backoff dibiarkan) dalam batas
+        waktu yang sama. Mengembalikan False bila masih ada yang berjalan
+        (lease-nya akan habis dan notifikasinya diambil ulang).
+        """
+        (self._drain if drain else self._stop).set(); self._wake.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        # Waktu habis: sisa antrean ditinggal, cukup selesaikan yang sedang diproses
+        self._stop.set()
+        return not any(t.is_alive() for t in self._threads)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"ERROR antrean notifikasi: {e}"); job = None
+            if job is None:
+                if self._drain.is_set(): return
+                self._wake.wait(self.poll); self._wake.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job):
+        try:
+            result = self.handler(job)
+        except Exception as e:
+            give_up = retried_seconds(job["attempts"]) >= self.retry_hours * 3600
+            print(f"ERROR memproses notifikasi {job['id']} (order {job['order_id']}, percobaan {job['attempts']}): {e}")
+            if give_up: print(f"PERINGATAN: notifikasi {job['id']} (order {job['order_id']}) gagal selama {self.retry_hours:g} jam; ditandai failed, antrekan ulang dengan `python notification_queue.py redrive`.")
+            self.queue.retry(job["id"], str(e), backoff(job["attempts"]), give_up)
+            return
+        error = result.get("message") if isinstance(result, dict) and result.get("status") == "error" else None
+        self.queue.finish(job["id"], error)
+
+
+def backoff(attempt):
+    """Jeda (detik) sebelum percobaan berikutnya setelah percobaan ke-`attempt` gagal."""
+    return min(2 ** attempt, MAX_BACKOFF)
+
+
+def retried_seconds(attempts):
+    """Jumlah jeda backoff setelah `attempts` percobaan gagal (waktu antrean terus mencoba, di luar waktu proses mati)."""
+    return sum(backoff(a) for a in range(1, attempts + 1))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="notification_queue", description="Antrean notifikasi Midtrans")
+    p.add_argument("--path", default=QUEUE_PATH, help="file antrean SQLite")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info", help="jumlah notifikasi per state")
+    rd = sub.add_parser("redrive", help="antrekan ulang notifikasi failed")
+    rd.add_argument("ids", nargs="*", type=int, help="id antrean (default: semua yang failed)")
+    args = p.parse_args(argv)
+
+    queue = NotificationQueue(args.path)
+    if args.cmd == "info":
+        for state, n in sorted(queue.counts().items()): print(f"  {state:10} {n:>8,}")
+    elif args.cmd == "redrive":
+        print(f"{queue.redrive(args.ids):,} notifikasi diantrekan ulang")
+
+
+if __name__ == "__main__":
+    main()
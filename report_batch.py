@@ -0,0 +1,105 @@
+# report_batch.py
+"""
+Penyusunan laporan keuangan secara batch dari baris perintah (tanpa Streamlit).
+
+Ledger dimuat sekali untuk jendela yang mencakup semua periode (dari cermin
+Parquet lokal atau langsung dari Supabase), lalu setiap periode disusun dan
+ditulis ke filenya sendiri di process pool. Snapshot ledger diberikan ke
+worker sekali lewat initializer; dengan start method fork, memorinya dibagi
+copy-on-write, bukan disalin per periode.
+
+    python report_batch.py --start 2025-01-01 --end 2025-12-31 --period M --out laporan/
+    python report_batch.py --range 2025-01-01:2025-06-30 --range 2025-07-01:2025-12-31 --source server
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import pandas as pd
+from financial_reports import COMPARE_FREQS, period_reports
+from ledger_mirror import LedgerMirror, MIRROR_DIR
+from ledger_store import LedgerCache, truncated_tables
+from report_export import EXPORT_FORMATS, WRITERS
+
+# Snapshot ledger milik proses worker (diisi initializer)
+_ledger = None
+
+
+def _init(ledger):
+    global _ledger
+    _ledger = ledger
+
+
+def periods(start, end, freq="M"):
+    """(awal, akhir) setiap periode `freq` yang beririsan dengan [start, end], dipotong ke batas itu."""
+    return [(max(p.start_time.date(), start), min(p.end_time.date(), end)) for p in pd.period_range(start, end, freq=freq)]
+
+
+def parse_range(text):
+    a, _, b = text.partition(":")
+    return date.fromisoformat(a), date.fromisoformat(b)
+
+
+def load_ledger(source, start, end, mirror_dir=MIRROR_DIR):
+    """Snapshot ledger untuk jendela [start, end] dari cermin lokal ('mirror', offline) atau Supabase ('server')."""
+    if source == "server":
+        from supabase_client import supabase
+        return LedgerCache(supabase).snapshot(start, end)
+    mirror = LedgerMirror(mirror_dir)
+    if not mirror.exists: raise RuntimeError(f"Cermin {mirror_dir} kosong; jalankan `python ledger_mirror.py sync` dulu")
+    return LedgerCache(None, mirror=mirror).snapshot(start, end)
+
+
+def run_period(job):
+    """Susun dan tulis semua laporan satu periode (di worker); mengembalikan ringkasannya."""
+    start, end, freq, fmt, out_dir = job
+    t = time.time()
+    reports = period_reports(_ledger, start, end, freq)
+    path = os.path.join(out_dir, f"Laporan_Keuangan_{start}_{end}.{EXPORT_FORMATS[fmt][1]}")
+    WRITERS[fmt](reports, path)
+    rows = sum(len(r) for r in reports.values() if isinstance(r, pd.DataFrame))
+    return {"start": start, "end": end, "path": path, "laba_bersih": reports["Laba Bersih"], "rows": rows, "seconds": time.time() - t}
+
+
+def run_batch(ledger, ranges, freq="M", fmt="xlsx", out_dir=".", workers=None):
+    """Jalankan `run_period` untuk setiap (awal, akhir) di `ranges` pada process pool; hasil berurutan seperti `ranges`."""
+    os.makedirs(out_dir, exist_ok=True)
+    ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    jobs = [(s, e, freq, fmt, out_dir) for s, e in ranges]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init, initargs=(ledger,)) as pool:
+        yield from pool.map(run_period, jobs)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="report_batch", description="Susun laporan keuangan banyak periode sekaligus")
+    p.add_argument("--start", type=date.fromisoformat, help="awal rentang yang dipecah per --period")
+    p.add_argument("--end", type=date.fromisoformat, help="akhir rentang yang dipecah per --period")
+    p.add_argument("--period", choices=list(COMPARE_FREQS), default="M", help="pecahan periode untuk --start/--end (default bulanan)")
+    p.add_argument("--range", action="append", type=parse_range, default=[], metavar="AWAL:AKHIR", help="rentang eksplisit, boleh berulang")
+    p.add_argument("--freq", choices=list(COMPARE_FREQS), default="M", help="kolom laporan komparatif")
+    p.add_argument("--format", choices=list(WRITERS), default="xlsx")
+    p.add_argument("--out", default="laporan", help="direktori tujuan")
+    p.add_argument("--workers", type=int, default=None, help="jumlah proses (default: jumlah CPU)")
+    p.add_argument("--source", choices=["mirror", "server"], default="mirror", help="cermin lokal (offline) atau Supabase")
+    p.add_argument("--mirror-dir", default=MIRROR_DIR or ".ledger_mirror")
+    args = p.parse_args(argv)
+
+    ranges = list(args.range)
+    if args.start or args.end:
+        if not (args.start and args.end): p.error("--start dan --end harus diisi bersama")
+        ranges += periods(args.start, args.end, args.period)
+    if not ranges: p.error("isi --start/--end atau --range")
+
+    t = time.time()
+    ledger = load_ledger(args.source, min(s for s, _ in ranges), max(e for _, e in ranges), args.mirror_dir)
+    for k in truncated_tables(ledger["counts"]):
+        print(f"PERINGATAN: data {k} tidak lengkap ({ledger['counts'][k]['fetched']:,} dari {ledger['counts'][k]['expected']:,} baris)")
+    print(f"Ledger dimuat dalam {time.time() - t:.1f} dtk; {len(ranges)} periode")
+    for r in run_batch(ledger, ranges, args.freq, args.format, args.out, args.workers):
+        print(f"{r['start']} s.d. {r['end']}: laba bersih {r['laba_bersih']:,.0f}, {r['rows']:,} baris, {r['seconds']:.1f} dtk -> {r['path']}")
+
+
+if __name__ == "__main__":
+    main()
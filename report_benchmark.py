@@ -0,0 +1,210 @@
+# report_benchmark.py
+"""
+Benchmark penyusun laporan atas ledger sintetis yang deterministik.
+
+`synthetic_ledger(n_lines, seed)` membuat COA, jurnal, baris jurnal, dan
+pergerakan persediaan langsung sebagai frame bertipe ringkas (sama seperti
+cache ledger), tanpa Supabase. Seed dan ukuran yang sama selalu memberi data
+yang sama, sehingga hasil antar-commit bisa dibandingkan.
+
+Setiap laporan diukur waktunya (beberapa ulangan, tanpa tracemalloc) lalu
+puncak alokasi memorinya (satu kali lagi, dengan tracemalloc). Hasil ditulis
+sebagai JSON; `--baseline` membandingkannya dengan hasil commit sebelumnya.
+
+    python report_benchmark.py --sizes 10000 100000 1000000 --out bench.json
+    python report_benchmark.py --sizes 100000 --baseline bench_main.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+import numpy as np
+import pandas as pd
+from financial_reports import (calc_tb, calc_worksheet, closing_reports, comparative_reports, create_cashflow,
+                               period_data, period_reports, report_gj, report_gl, report_inv)
+from ledger_store import ENTRY_COLUMNS, BalanceIndex, line_dates, opening_frame, typed_frame
+from report_export import WRITERS
+
+SIZES = [10_000, 100_000, 1_000_000]
+CASH = '1-1100'
+# (kode, nama, tipe, saldo normal)
+CHART = [
+    ('1-1100', 'Kas', 'Aset', 'Debit'), ('1-1200', 'Persediaan', 'Aset', 'Debit'),
+    ('1-1300', 'Piutang Usaha', 'Aset', 'Debit'), ('1-2100', 'Tanah', 'Aset', 'Debit'),
+    ('1-2200', 'Peralatan', 'Aset', 'Debit'), ('1-2210', 'Akumulasi Penyusutan Peralatan', 'Aset', 'Credit'),
+    ('2-1100', 'Utang Usaha', 'Liabilitas', 'Credit'), ('2-2100', 'Utang Bank', 'Liabilitas', 'Credit'),
+    ('3-1100', 'Modal', 'Ekuitas', 'Credit'), ('3-1200', 'Prive', 'Ekuitas', 'Debit'),
+    ('4-1100', 'Penjualan', 'Pendapatan', 'Credit'), ('5-1100', 'Harga Pokok Penjualan', 'Beban', 'Debit'),
+    ('6-1100', 'Beban Gaji', 'Beban', 'Debit'), ('6-1200', 'Beban Listrik', 'Beban', 'Debit'),
+    ('6-1300', 'Beban Penyusutan', 'Beban', 'Debit'), ('8-1100', 'Pendapatan Bunga', 'Pendapatan', 'Credit'),
+    ('9-1100', 'Beban Bunga', 'Beban', 'Debit'),
+]
+DESCRIPTIONS = ['Penjualan tunai', 'Bayar gaji', 'Bayar listrik', 'Prive pemilik', 'Bayar angsuran utang bank',
+                'Beli tanah', 'Beli aset peralatan', 'Bunga bank', 'Pinjaman bank', 'Setoran modal', 'Pembelian persediaan']
+PRODUCTS = 50
+
+
+def synthetic_ledger(n_lines, seed=0, start=date(2024, 1, 1), days=730):
+    """
+    Snapshot ledger sintetis (bentuk `LedgerCache.snapshot`) dengan sekitar
+    `n_lines` baris jurnal seimbang: 60% jurnal dua baris, 40% empat baris
+    (ditambah pasangan HPP/persediaan), tanggal naik seiring id jurnal, serta
+    n_lines/4 pergerakan persediaan untuk PRODUCTS produk.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array([c[0] for c in CHART], dtype=object)
+    coa = pd.DataFrame(CHART, columns=['account_code', 'account_name', 'account_type', 'normal_balance'])
+
+    per_entry = np.where(rng.random(int(n_lines / 2.8) + 2) < 0.4, 4, 2)
+    per_entry = per_entry[:max(int(np.searchsorted(per_entry.cumsum(), n_lines, side='right')), 1)]
+    n_ent = len(per_entry)
+    ids = np.arange(1, n_ent + 1)
+    tx_date = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n_ent)), unit='D')
+    entries = pd.DataFrame({'id': ids, 'transaction_date': tx_date,
+                            'description': rng.choice(DESCRIPTIONS, n_ent), 'order_id': None}, columns=ENTRY_COLUMNS)
+
+    # Akun debit/kredit per jurnal; 60% jurnal melibatkan kas di salah satu sisi
+    a = rng.choice(codes, n_ent); b = rng.choice(codes, n_ent)
+    side = rng.random(n_ent)
+    a = np.where(side < 0.3, CASH, a); b = np.where((side >= 0.3) & (side < 0.6), CASH, b)
+    b = np.where(a == b, np.where(a == '4-1100', '6-1100', '4-1100'), b)
+    amount = rng.integers(1, 5000, n_ent) * 1000
+
+    jid = np.repeat(ids, per_entry)
+    pos = np.arange(len(jid)) - np.repeat(per_entry.cumsum() - per_entry, per_entry)
+    amt = np.repeat(amount, per_entry)
+    account = np.select([pos == 0, pos == 1, pos == 2], [np.repeat(a, per_entry), np.repeat(b, per_entry), '5-1100'], '1-1200')
+    lines = pd.DataFrame({
+        'id': np.arange(1, len(jid) + 1), 'journal_id': jid, 'account_code': account,
+        'debit_amount': np.select([pos == 0, pos == 2], [amt, amt // 2], 0),
+        'credit_amount': np.select([pos == 1, pos == 3], [amt, amt // 2], 0),
+    })
+
+    n_mov = max(n_lines // 4, 1)
+    product = rng.integers(1, PRODUCTS + 1, n_mov)
+    receipt = rng.random(n_mov) < 0.5
+    qty = rng.integers(1, 50, n_mov)
+    mov = pd.DataFrame({
+        'id': np.arange(1, n_mov + 1), 'product_id': product,
+        'movement_date': pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n_mov)), unit='D'),
+        'movement_type': np.where(receipt, 'RECEIPT', 'ISSUE'), 'quantity_change': np.where(receipt, qty, -qty),
+        'unit_cost': rng.integers(5, 500, n_mov) * 100, 'reference_id': [f"REF-{i}" for i in range(1, n_mov + 1)],
+        'product_name': pd.Series(product).map(lambda p: f"Produk {p:02d}").to_numpy(),
+    })
+
+    entries, lines, mov = typed_frame("entries", entries), typed_frame("lines", lines), typed_frame("mov", mov)
+    opening = opening_frame()
+    return {"entries": entries, "lines": lines, "coa": coa, "mov": mov, "opening": opening,
+            "window": (None, None), "index": BalanceIndex.build(lines, line_dates(lines, entries), opening)}
+
+
+def _write(fmt):
+    def run(ctx):
+        fd, path = tempfile.mkstemp(suffix="." + fmt); os.close(fd)
+        try: WRITERS[fmt](ctx["reports"], path)
+        finally: os.remove(path)
+    return run
+
+
+# nama -> fungsi(ctx); ctx berisi snapshot `d`, periode, hasil `period_data`, dan semua laporan (untuk ekspor)
+BENCHMARKS = {
+    "balance_index": lambda c: BalanceIndex.build(c["d"]["lines"], line_dates(c["d"]["lines"], c["d"]["entries"])),
+    "get_data": lambda c: period_data(c["d"], c["start"], c["end"]),
+    "report_gj": lambda c: report_gj(c["df"]),
+    "report_gl": lambda c: report_gl(c["df"], c["coa"], c["opening"], c["start"]),
+    "calc_tb": lambda c: calc_tb(c["df"], c["coa"], c["opening"]),
+    "calc_worksheet": lambda c: calc_worksheet(c["df"], c["coa"], c["opening"]),
+    "closing_reports": lambda c: closing_reports(c["coa"], c["d"]["index"].as_of(c["end"])),
+    "comparative_reports": lambda c: comparative_reports(c["df"], c["coa"], c["opening"], c["start"], c["end"], "M"),
+    "report_inv": lambda c: report_inv(c["mov"]),
+    "create_cashflow": lambda c: create_cashflow(c["df"]),
+    "export_xlsx": _write("xlsx"),
+    "export_csv": _write("csv"),
+    "export_parquet": _write("parquet"),
+}
+
+
+def measure(fn, ctx, repeat=3, budget=30.0):
+    """Waktu (detik) setiap ulangan — berhenti lebih awal bila total melewati `budget` — lalu puncak memori satu run dengan tracemalloc."""
+    times = []
+    while len(times) < repeat and sum(times) < budget:
+        t = time.perf_counter(); out = fn(ctx); times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    try:
+        fn(ctx); peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    rows = len(out) if isinstance(out, pd.DataFrame) else None
+    return {"seconds_min": min(times), "seconds_median": statistics.median(times), "runs": len(times), "peak_mb": peak / 2 ** 20, "rows_out": rows}
+
+
+def _commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+
+def run(sizes=SIZES, seed=0, names=None, repeat=3, budget=30.0, log=print):
+    """Jalankan benchmark untuk setiap ukuran; mengembalikan dict hasil (siap ditulis sebagai JSON)."""
+    names = list(names or BENCHMARKS)
+    results = []
+    for n in sizes:
+        t = time.perf_counter(); d = synthetic_ledger(n, seed)
+        log(f"[{n:,} baris] ledger sintetis {len(d['lines']):,} baris jurnal, {len(d['mov']):,} pergerakan ({time.perf_counter() - t:.1f} dtk)")
+        start, end = d["entries"]['transaction_date'].min().date(), d["entries"]['transaction_date'].max().date()
+        df, coa, mov, opening = period_data(d, start, end)
+        ctx = {"d": d, "start": start, "end": end, "df": df, "coa": coa, "mov": mov, "opening": opening}
+        if any(x.startswith("export_") for x in names): ctx["reports"] = period_reports(d, start, end)
+        for name in names:
+            r = {"size": n, "lines": len(d["lines"]), "report": name, **measure(BENCHMARKS[name], ctx, repeat, budget)}
+            results.append(r)
+            log(f"  {name:20} {r['seconds_min']:9.3f} dtk  {r['peak_mb']:9.1f} MB")
+    return {
+        "commit": _commit(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": seed,
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "machine": platform.machine(), "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=1.25):
+    """Baris (size, report, rasio waktu, rasio memori) yang melambat/membengkak melewati `tolerance` dibanding `baseline`."""
+    base = {(r["size"], r["report"]): r for r in baseline["results"]}
+    worse = []
+    for r in current["results"]:
+        b = base.get((r["size"], r["report"]))
+        if b is None: continue
+        t = r["seconds_min"] / b["seconds_min"] if b["seconds_min"] else 1.0
+        m = r["peak_mb"] / b["peak_mb"] if b["peak_mb"] else 1.0
+        if t > tolerance or m > tolerance: worse.append((r["size"], r["report"], t, m))
+    return worse
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="report_benchmark", description="Benchmark laporan keuangan atas ledger sintetis")
+    p.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="jumlah baris jurnal")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="hanya laporan ini")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--budget", type=float, default=30.0, help="batas detik ulangan per laporan")
+    p.add_argument("--out", default="bench_results.json")
+    p.add_argument("--baseline", help="JSON hasil sebelumnya untuk dibandingkan")
+    p.add_argument("--tolerance", type=float, default=1.25, help="rasio terhadap baseline yang dianggap regresi")
+    args = p.parse_args(argv)
+
+    res = run(args.sizes, args.seed, args.only, args.repeat, args.budget)
+    with open(args.out, "w", encoding="utf-8") as f: json.dump(res, f, indent=2)
+    print(f"Hasil ditulis ke {args.out}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f: worse = compare(res, json.load(f), args.tolerance)
+        for size, name, t, m in worse: print(f"REGRESI {name} @ {size:,}: waktu x{t:.2f}, memori x{m:.2f}")
+        if worse: raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# report_export.py
+"""
+Ekspor laporan keuangan ke Excel, CSV, atau Parquet.
+
+Workbook ditulis baris demi baris dengan mode `constant_memory` xlsxwriter
+langsung ke file sementara, sehingga memori tidak ikut membesar seiring
+jumlah baris (mis. Buku Besar akhir tahun). CSV dan Parquet ditulis per
+potongan baris, satu file per laporan, lalu dibungkus dalam satu zip.
+
+`start_export` menjalankan ekspor di worker latar belakang dan
+mengembalikan `ExportJob` yang menyimpan progres (baris tertulis / total).
+File sementaranya dihapus saat job dibuang (termasuk ketika sesi Streamlit
+kedaluwarsa dan job-nya di-garbage-collect); sisa proses yang mati disapu
+setiap kali ekspor baru dimulai.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import io
+import os
+import tempfile
+import time
+import weakref
+import zipfile
+import pandas as pd
+
+# Jumlah baris yang dikonversi/ditulis per potongan
+CHUNK_ROWS = 5000
+# Jumlah ekspor yang boleh berjalan bersamaan di satu proses
+EXPORT_WORKERS = 2
+# format -> (label, ekstensi file, mime)
+EXPORT_FORMATS = {
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (zip)", "zip", "application/zip"),
+    "parquet": ("Parquet (zip)", "zip", "application/zip"),
+}
+
+# File ekspor sementara yang lebih tua dari ini (detik) dianggap yatim dan disapu
+EXPORT_MAX_AGE = 6 * 3600
+TEMP_PREFIX = "laporan_"
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def _frames(reports):
+    """Hanya entri DataFrame yang diekspor (nilai skalar seperti Laba Bersih dilewati)."""
+    return {name: df for name, df in reports.items() if isinstance(df, pd.DataFrame)}
+
+
+def _chunks(df, size=CHUNK_ROWS):
+    for i in range(0, len(df), size): yield df.iloc[i:i + size]
+
+
+def _cells(chunk):
+    """Baris sebagai tuple objek Python; NaN/NaT menjadi None (sel kosong)."""
+    return chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_xlsx(reports, path, progress=None):
+    """Tulis setiap laporan sebagai sheet dengan mode constant_memory (baris harus urut naik)."""
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+    try:
+        bold = wb.add_format({'bold': True})
+        for name, df in _frames(reports).items():
+            ws = wb.add_worksheet(name[:30])
+            ws.write_row(0, 0, [str(c) for c in df.columns], bold)
+            row = 1
+            for chunk in _chunks(df):
+                for r in _cells(chunk): ws.write_row(row, 0, r); row += 1
+                if progress: progress(len(chunk))
+    finally:
+        wb.close()
+
+
+def write_csv(reports, path, progress=None):
+    """Zip berisi satu CSV per laporan, ditulis per potongan."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, df in _frames(reports).items():
+            with zf.open(f"{name}.csv", 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+                if df.empty: df.to_csv(f, index=False)
+                for i, chunk in enumerate(_chunks(df)):
+                    chunk.to_csv(f, index=False, header=i == 0)
+                    if progress: progress(len(chunk))
+
+
+def _parquet_ready(df):
+    """Kolom objek campuran (mis. angka dan '' di Laba Rugi) dijadikan teks agar skemanya tunggal."""
+    out = df.copy()
+    for c in out.columns[out.dtypes == object]:
+        if pd.api.types.infer_dtype(out[c], skipna=True) != 'string':
+            out[c] = out[c].map(lambda x: None if x is None or x != x else str(x))
+    out.columns = [str(c) for c in out.columns]
+    return out
+
+
+def write_parquet(reports, path, progress=None):
+    """Zip berisi satu file Parquet per laporan; setiap potongan menjadi satu row group."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with tempfile.TemporaryDirectory() as tmp, zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as zf:
+        for name, df in _frames(reports).items():
+            df = _parquet_ready(df); schema = pa.Schema.from_pandas(df, preserve_index=False)
+            part = os.path.join(tmp, f"{name}.parquet")
+            with pq.ParquetWriter(part, schema) as writer:
+                if df.empty: writer.write_table(schema.empty_table())
+                for chunk in _chunks(df):
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    if progress: progress(len(chunk))
+            zf.write(part, f"{name}.parquet"); os.remove(part)
+
+
+WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "parquet": write_parquet}
+
+
+class ExportJob:
+    """Satu ekspor di latar belakang: progres, file hasil, dan error bila gagal."""
+
+    def __init__(self, reports, fmt, key=None):
+        if fmt not in WRITERS: raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+        self.fmt, self.key = fmt, key
+        self.reports = _frames(reports)
+        self.total = sum(len(df) for df in self.reports.values())
+        self.done = 0; self.error = None; self.cancelled = False
+        fd, self.path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix="." + EXPORT_FORMATS[fmt][1]); os.close(fd)
+        # File ikut terhapus saat job di-garbage-collect (sesi berakhir tanpa discard)
+        self._cleanup = weakref.finalize(self, _remove_file, self.path)
+        self.future = None
+
+    @property
+    def running(self): return self.future is not None and not self.future.done()
+
+    @property
+    def ratio(self): return min(self.done / self.total, 1.0) if self.total else 1.0
+
+    @property
+    def ok(self): return self.future is not None and self.future.done() and self.error is None
+
+    def _advance(self, n):
+        if self.cancelled: raise RuntimeError("Ekspor dibatalkan")
+        self.done += n
+
+    def _run(self):
+        try:
+            WRITERS[self.fmt](self.reports, self.path, self._advance)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.reports = None  # lepaskan DataFrame setelah ditulis
+            if self.error is not None or self.cancelled: self._remove()
+
+    def start(self):
+        self.future = _executor.submit(self._run)
+        return self
+
+    def discard(self):
+        """Hapus file sementara (ekspor lama yang diganti atau gagal)."""
+        self.cancelled = True
+        if not self.running: self._remove()  # bila masih berjalan, worker yang menghapus saat berhenti
+
+    def _remove(self):
+        self._cleanup()
+
+
+def _remove_file(path):
+    try: os.remove(path)
+    except OSError: pass
+
+
+def sweep_exports(max_age=EXPORT_MAX_AGE):
+    """Hapus file ekspor sementara yang lebih tua dari `max_age` detik (sisa proses mati). Mengembalikan jumlahnya."""
+    cutoff, removed = time.time() - max_age, 0
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), TEMP_PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) < cutoff: os.remove(path); removed += 1
+        except OSError: pass
+    return removed
+
+
+def start_export(reports, fmt, key=None):
+    """Mulai ekspor `reports` ({nama sheet: DataFrame}) ke format `fmt` di worker latar belakang."""
+    sweep_exports()
+    return ExportJob(reports, fmt, key).start()
@@ -0,0 +1,33 @@
+-- Saldo awal untuk laporan periode.
+-- Laporan hanya mengambil jurnal di dalam rentang tanggal yang dipilih; saldo
+-- semua jurnal sebelum tanggal mulai dihitung di sini dalam satu query agregat,
+-- dipisah antara jurnal umum dan jurnal penyesuaian (journal_id >= p_adjusting_from).
+-- p_max_entry_id / p_max_line_id membekukan hasil pada high-water mark cache klien.
+
+create index if not exists journal_entries_transaction_date_idx
+    on public.journal_entries (transaction_date, id);
+
+create index if not exists journal_lines_journal_id_idx
+    on public.journal_lines (journal_id);
+
+create or replace function public.ledger_opening_balances(
+    p_before date,
+    p_max_entry_id bigint default null,
+    p_max_line_id bigint default null,
+    p_adjusting_from bigint default 200
+)
+returns table (account_code text, adjusting boolean, debit_amount numeric, credit_amount numeric)
+language sql
+stable
+as $$
+    select l.account_code::text,
+           l.journal_id >= p_adjusting_from,
+           coalesce(sum(l.debit_amount), 0)::numeric,
+           coalesce(sum(l.credit_amount), 0)::numeric
+    from public.journal_lines l
+    join public.journal_entries e on e.id = l.journal_id
+    where e.transaction_date < p_before
+      and (p_max_entry_id is null or e.id <= p_max_entry_id)
+      and (p_max_line_id is null or l.id <= p_max_line_id)
+    group by 1, 2;
+$$;
@@ -0,0 +1,32 @@
+-- Neraca saldo yang diagregasi di database.
+-- Total debit/kredit per akun untuk jurnal p_start <= transaction_date <= p_end
+-- (null = tanpa batas), dipisah antara jurnal umum dan jurnal penyesuaian
+-- (journal_id >= p_adjusting_from): baris adjusting = false adalah TB,
+-- adjusting = true adalah MJ, dan jumlah keduanya TB ADJ. Klien menerima
+-- satu baris per (akun, penyesuaian), bukan seluruh baris jurnal.
+-- p_max_entry_id / p_max_line_id membekukan hasil pada high-water mark cache klien.
+-- Secara lokal, `supabase start` menjalankan Postgres dengan migrasi ini.
+
+create or replace function public.ledger_trial_balance(
+    p_end date default null,
+    p_start date default null,
+    p_max_entry_id bigint default null,
+    p_max_line_id bigint default null,
+    p_adjusting_from bigint default 200
+)
+returns table (account_code text, adjusting boolean, debit_amount numeric, credit_amount numeric)
+language sql
+stable
+as $$
+    select l.account_code::text,
+           l.journal_id >= p_adjusting_from,
+           coalesce(sum(l.debit_amount), 0)::numeric,
+           coalesce(sum(l.credit_amount), 0)::numeric
+    from public.journal_lines l
+    join public.journal_entries e on e.id = l.journal_id
+    where (p_start is null or e.transaction_date >= p_start)
+      and (p_end is null or e.transaction_date < p_end + 1)
+      and (p_max_entry_id is null or e.id <= p_max_entry_id)
+      and (p_max_line_id is null or l.id <= p_max_line_id)
+    group by 1, 2;
+$$;
@@ -0,0 +1,76 @@
+-- Posting penjualan lunas dalam satu transaksi database.
+-- Satu panggilan menggantikan lima round trip webhook (ambil order + item,
+-- insert journal_entries, insert journal_lines, insert inventory_movements,
+-- update orders): jurnal kas/penjualan, jurnal HPP/persediaan per item,
+-- movement ISSUE, dan status order 'settle' tersimpan semua atau tidak sama
+-- sekali.
+-- Idempoten per order: bila order sudah punya jurnal penjualan, id jurnal itu
+-- dikembalikan tanpa menulis apa pun, sehingga pengulangan (retry antrean
+-- setelah timeout, fallback batch, proses mati sebelum dicatat `processed`)
+-- tidak memosting dua kali. Baris order dikunci (for update) sebelum
+-- pengecekan itu agar dua pemanggil bergiliran dan yang kedua melihat jurnal
+-- yang pertama.
+-- Mengembalikan id journal_entries, atau null bila order tidak ditemukan.
+
+create index if not exists journal_entries_order_id_idx on public.journal_entries (order_id);
+
+create or replace function public.post_sales_journal(
+    p_order_id bigint,
+    p_transaction_id text default null,
+    p_status text default 'settle'
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_order public.orders%rowtype;
+    v_journal_id bigint;
+begin
+    select * into v_order from public.orders where id = p_order_id for update;
+    if not found then
+        return null;
+    end if;
+
+    select id into v_journal_id from public.journal_entries
+    where order_id = p_order_id
+    order by id
+    limit 1;
+    if found then
+        return v_journal_id;
+    end if;
+
+    insert into public.journal_entries (order_id, transaction_date, description, user_id)
+    values (p_order_id, current_date, 'Jurnal Penjualan Tunai Order ID: ' || p_order_id, v_order.user_id)
+    returning id into v_journal_id;
+
+    -- Kas (debit) vs Penjualan (kredit), lalu per item: HPP (debit) vs Persediaan (kredit)
+    insert into public.journal_lines (journal_id, account_code, debit_amount, credit_amount)
+    select v_journal_id, x.account_code, x.debit_amount, x.credit_amount
+    from (
+        select 0 as item_id, 0 as seq, '1-1100' as account_code, v_order.total_amount as debit_amount, 0 as credit_amount
+        union all
+        select 0, 1, '4-1100', 0, v_order.total_amount
+        union all
+        select i.id, 0, coalesce(p.hpp_account_code, '5-1100'), i.quantity * p.cost_price, 0
+        from public.order_items i join public.products p on p.id = i.product_id
+        where i.order_id = p_order_id and p.cost_price > 0 and i.quantity > 0
+        union all
+        select i.id, 1, coalesce(p.inventory_account_code, '1-1200'), 0, i.quantity * p.cost_price
+        from public.order_items i join public.products p on p.id = i.product_id
+        where i.order_id = p_order_id and p.cost_price > 0 and i.quantity > 0
+    ) x
+    order by x.item_id, x.seq;
+
+    insert into public.inventory_movements (product_id, movement_date, movement_type, quantity_change, unit_cost, reference_id)
+    select i.product_id, current_date, 'ISSUE', -i.quantity, p.cost_price, 'ORDER-' || p_order_id
+    from public.order_items i join public.products p on p.id = i.product_id
+    where i.order_id = p_order_id and p.cost_price > 0 and i.quantity > 0
+    order by i.id;
+
+    update public.orders
+    set status = p_status, midtrans_order_id = p_transaction_id
+    where id = p_order_id;
+
+    return v_journal_id;
+end;
+$$;
@@ -0,0 +1,23 @@
+-- Posting penjualan lunas untuk banyak order dalam satu panggilan (mode batch webhook).
+-- p_orders: [{"order_id": 15, "transaction_id": "..."}, ...]. Setiap order tetap
+-- mendapat jurnalnya sendiri lewat post_sales_journal; satu batch = satu round
+-- trip dan satu transaksi (gagal satu, batal semua; klien lalu mengulang per order).
+-- Idempoten seperti post_sales_journal: order yang sudah berjurnal (termasuk order
+-- yang muncul dua kali dalam p_orders, atau batch yang diulang setelah timeout)
+-- mengembalikan jurnal yang sudah ada tanpa posting ulang.
+-- Mengembalikan (order_id, journal_id) per order; journal_id null bila order tidak ditemukan.
+
+create or replace function public.post_sales_journals(p_orders jsonb)
+returns table (order_id bigint, journal_id bigint)
+language plpgsql
+as $$
+declare
+    v_item jsonb;
+begin
+    for v_item in select value from jsonb_array_elements(p_orders) loop
+        order_id := (v_item->>'order_id')::bigint;
+        journal_id := public.post_sales_journal(order_id, v_item->>'transaction_id');
+        return next;
+    end loop;
+end;
+$$;
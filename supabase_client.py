@@ -7,4 +7,8 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+def connect():
+    """Klien Supabase baru (mis. satu per proses worker server)."""
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+supabase = connect()
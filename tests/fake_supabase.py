@@ -0,0 +1,169 @@
+"""Pengganti klien Supabase untuk tes: tabel di memori (subset query builder PostgREST) dan RPC yang menjalankan SQL migrasi di SQLite."""
+import glob
+import operator
+import os
+import re
+import sqlite3
+import threading
+
+from ledger_store import PAGE_SIZE
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), "..", "supabase", "migrations")
+OPS = {"eq": operator.eq, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def function_body(name):
+    """Badan fungsi SQL `name` dari file migrasi."""
+    for path in sorted(glob.glob(os.path.join(MIGRATIONS, "*.sql"))):
+        with open(path) as f: src = f.read()
+        m = re.search(r"function public\.%s\(.*?\)\s*returns.*?as \$\$(.*?)\$\$" % name, src, re.S)
+        if m: return m.group(1)
+    raise LookupError(name)
+
+
+def to_sqlite(sql):
+    """Terjemahan dialek seperlunya: tanpa skema, tanpa cast `::tipe`, `p_x + 1` (date) -> date(:p_x, '+1 day'), parameter -> :p_x."""
+    sql = sql.replace("public.", "")
+    sql = re.sub(r"::\w+", "", sql)
+    sql = re.sub(r"(p_\w+) \+ 1", r"date(:\1, '+1 day')", sql)
+    return re.sub(r"(?<![:\w])(p_\w+)", r":\1", sql)
+
+
+def ledger_sqlite(entries, lines):
+    """SQLite berisi journal_entries (tanggal 'YYYY-MM-DD') dan journal_lines dari baris dict."""
+    con = sqlite3.connect(":memory:")
+    con.execute("create table journal_entries (id integer, transaction_date text)")
+    con.execute("create table journal_lines (id integer, journal_id integer, account_code text, debit_amount numeric, credit_amount numeric)")
+    con.executemany("insert into journal_entries values (:id, :transaction_date)", entries)
+    con.executemany("insert into journal_lines values (:id, :journal_id, :account_code, :debit_amount, :credit_amount)", lines)
+    return con
+
+
+def balance_rpc(con, fn, params):
+    cur = con.execute(to_sqlite(function_body(fn)), params)
+    return [dict(account_code=a, adjusting=bool(b), debit_amount=c, credit_amount=d) for a, b, c, d in cur.fetchall()]
+
+
+class Result:
+    def __init__(self, data, count=None): self.data, self.count = data, count
+    def execute(self): return self
+
+
+class Query:
+    """
+    select (dengan embed `tabel(...)` / `tabel!inner(...)` dan count), filter
+    perbandingan, order, limit, dan offset. Filter `embed.kolom` menyaring daftar
+    embed to-many, atau baris induk untuk embed to-one (inner join).
+    """
+
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.filters, self.orders, self.embeds, self.n, self.skip, self.count = [], [], [], None, 0, None
+
+    def select(self, columns, count=None):
+        self.embeds, self.count = re.findall(r"(\w+)(?:!inner)?\(", columns), count
+        return self
+
+    def order(self, key, desc=False): self.orders.append((key, desc)); return self
+    def limit(self, n): self.n = n; return self
+    def offset(self, n): self.skip = n; return self
+
+    def __getattr__(self, op):
+        if op not in OPS: raise AttributeError(op)
+        def f(key, value): self.filters.append((key, OPS[op], value)); return self
+        return f
+
+    def _row(self, row):
+        out = dict(row)
+        for emb in self.embeds:
+            value = self.db.embed(self.table, emb, row)
+            for key, op, v in self.filters:
+                if not key.startswith(emb + "."): continue
+                col = key[len(emb) + 1:]
+                if isinstance(value, list): value = [r for r in value if op(r[col], v)]
+                elif value is None or not op(value[col], v): return None
+            out[emb] = value
+        return out if all(op(row[k], v) for k, op, v in self.filters if "." not in k) else None
+
+    def execute(self):
+        # Request dari pool thread dilayani satu per satu, seperti snapshot per statement di server
+        with self.db.lock:
+            self.db.index = {}
+            rows = [r for r in map(self._row, self.db.tables[self.table]) if r is not None]
+            for key, desc in reversed(self.orders): rows.sort(key=lambda r: r[key], reverse=desc)
+            page = rows[self.skip:self.skip + min(self.n or PAGE_SIZE, PAGE_SIZE)]
+            res = Result(page, len(rows) if self.count else None)
+            self.db.on_request(self)
+        return res
+
+
+class FakeSupabase:
+    """
+    Ledger Supabase di memori dari `synthetic_ledger`. `hold` memisahkan baris
+    yang belum ter-commit (tidak terlihat sampai `commit`); `on_request(query)`
+    dipanggil setelah setiap request tabel (untuk menyisipkan baris di tengah fetch).
+    """
+
+    def __init__(self, ledger):
+        day = lambda t: t.strftime('%Y-%m-%d')
+        self.tables = {
+            "journal_entries": [dict(id=int(r.id), transaction_date=day(r.transaction_date), description=r.description, order_id=None)
+                                for r in ledger["entries"].itertuples()],
+            "journal_lines": [dict(id=int(r.id), journal_id=int(r.journal_id), account_code=str(r.account_code),
+                                   debit_amount=float(r.debit_amount), credit_amount=float(r.credit_amount))
+                              for r in ledger["lines"].itertuples()],
+            "inventory_movements": [dict(id=int(r.id), product_id=int(r.product_id), movement_date=day(r.movement_date),
+                                         movement_type=r.movement_type, quantity_change=int(r.quantity_change),
+                                         unit_cost=float(r.unit_cost), reference_id=r.reference_id)
+                                    for r in ledger["mov"].itertuples()],
+            "chart_of_accounts": ledger["coa"].to_dict("records"),
+        }
+        self.held = {k: [] for k in self.tables}
+        self.index = {}
+        self.lock = threading.Lock()
+        self.on_request = lambda query: None
+
+    def table(self, name): return Query(self, name)
+
+    def rpc(self, fn, params):
+        return Result(balance_rpc(ledger_sqlite(self.tables["journal_entries"], self.tables["journal_lines"]), fn, params))
+
+    def _by(self, table, key):
+        """Baris `table` dikelompokkan per `key` (dibangun ulang setiap request)."""
+        if (table, key) not in self.index:
+            groups = self.index[(table, key)] = {}
+            for r in self.tables[table]: groups.setdefault(r[key], []).append(r)
+        return self.index[(table, key)]
+
+    def embed(self, table, name, row):
+        if name == "journal_lines":
+            return [dict(r) for r in self._by(name, "journal_id").get(row["id"], [])]
+        if name == "journal_entries":
+            return next((dict(r) for r in self._by(name, "id").get(row["journal_id"], [])), None)
+        if name == "products":
+            return {"name": f"Produk {row['product_id']:02d}"}
+        raise KeyError(name)
+
+    def top(self, table):
+        return max(r["id"] for r in self.tables[table] + self.held[table])
+
+    def add_entry(self, date, amounts, entry_id=None, hold=False):
+        """Sisipkan jurnal bertanggal `date` dengan baris (akun, debit, kredit); id berikutnya bila `entry_id` kosong."""
+        entry_id = entry_id or self.top("journal_entries") + 1
+        target = self.held if hold else self.tables
+        target["journal_entries"].append(dict(id=entry_id, transaction_date=date, description="Tes", order_id=None))
+        for code, d, c in amounts:
+            target["journal_lines"].append(dict(id=self.top("journal_lines") + 1, journal_id=entry_id, account_code=code,
+                                                debit_amount=float(d), credit_amount=float(c)))
+        return entry_id
+
+    def hold(self, entry_id):
+        """Jadikan jurnal `entry_id` beserta barisnya belum ter-commit."""
+        for table, key in (("journal_entries", "id"), ("journal_lines", "journal_id")):
+            self.held[table] += [r for r in self.tables[table] if r[key] == entry_id]
+            self.tables[table] = [r for r in self.tables[table] if r[key] != entry_id]
+
+    def commit(self):
+        """Commit semua baris yang ditahan (id-nya di bawah baris yang sudah terlihat)."""
+        for table, rows in self.held.items():
+            self.tables[table] = sorted(self.tables[table] + rows, key=lambda r: r.get("id", 0)); rows.clear()
@@ -0,0 +1,19 @@
+"""Laporan Arus Kas: total harus skalar Python agar diformat Rupiah dan aman untuk Arrow."""
+import pandas as pd
+
+from cashflow import cashflow_statement
+
+
+def test_statement_totals_are_python_numbers():
+    lines = pd.DataFrame({
+        'journal_id': [1, 1, 2, 2, 3, 3],
+        'account_code': ['1-1100', '4-1100', '6-1100', '1-1100', '1-1100', '3-1100'],
+        'debit_amount': [1200, 0, 700, 0, 5000, 0],
+        'credit_amount': [0, 1200, 0, 700, 0, 5000],
+        'description_entry': ['Penjualan', 'Penjualan', 'Gaji', 'Gaji', 'Setoran modal', 'Setoran modal'],
+    })
+    cf = cashflow_statement(lines)
+    totals = cf[cf['Total'] != '']
+    assert all(type(v) in (int, float) for v in totals['Total'])
+    assert all(type(v) in (int, float) for v in cf.loc[cf['Jumlah'] != '', 'Jumlah'])
+    assert totals['Total'].iloc[-1] == 5500
@@ -0,0 +1,114 @@
+"""Buku Besar vektor (`report_gl`) harus identik dengan loop per akun sebelumnya."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financial_reports import period_data, report_gl
+from report_benchmark import synthetic_ledger
+
+
+def report_gl_loop(df, coa, opening=None, start=None):
+    """Implementasi lama (iterrows per akun), disalin apa adanya sebagai acuan."""
+    seed = {}
+    if opening is not None and not opening.empty:
+        tot = opening.groupby('account_code')[['debit_amount', 'credit_amount']].sum()
+        seed = (tot['debit_amount'] - tot['credit_amount']).to_dict()
+    if df.empty and not seed: return pd.DataFrame()
+    data = []
+    groups = dict(tuple(df.groupby('account_code'))) if not df.empty else {}
+    for ac in sorted(set(groups) | set(seed)):
+        if coa[coa['account_code']==ac].empty: continue
+        info = coa[coa['account_code']==ac].iloc[0]
+        net = seed.get(ac, 0)
+        bal = net if info['normal_balance']=='Debit' else -net
+        if ac in seed:
+            data.append({'Kode': ac, 'Nama': info['account_name'], 'Tgl': pd.Timestamp(start), 'Ket': 'Saldo Awal', 'Debit': 0, 'Kredit': 0, 'Saldo': bal})
+        if ac not in groups: continue
+        grp = groups[ac].sort_values(['transaction_date', 'journal_id', 'debit_amount'], ascending=[True, True, False])
+        for _, r in grp.iterrows():
+            d = r['debit_amount']; c = r['credit_amount']
+            bal += (d - c) if info['normal_balance']=='Debit' else (c - d)
+            data.append({'Kode': ac, 'Nama': info['account_name'], 'Tgl': r['transaction_date'], 'Ket': r.get('description_entry',''), 'Debit': d, 'Kredit': c, 'Saldo': bal})
+
+    res = pd.DataFrame(data)
+    if res.empty: return res
+    res['Tgl'] = res['Tgl'].dt.strftime('%Y-%m-%d')
+    res = res.merge(coa[['account_code', 'normal_balance']], left_on='Kode', right_on='account_code', how='left')
+
+    res['Saldo D'] = res.apply(lambda r: r['Saldo'] if r['normal_balance']=='Debit' and r['Saldo']>=0 else (-r['Saldo'] if r['normal_balance']=='Credit' and r['Saldo']<0 else 0), axis=1)
+    res['Saldo K'] = res.apply(lambda r: r['Saldo'] if r['normal_balance']=='Credit' and r['Saldo']>=0 else (-r['Saldo'] if r['normal_balance']=='Debit' and r['Saldo']<0 else 0), axis=1)
+
+    fin = res[['Kode', 'Nama', 'Tgl', 'Ket', 'Debit', 'Kredit', 'Saldo D', 'Saldo K']].sort_values(['Kode', 'Tgl'])
+    is_fst = fin.groupby('Kode').cumcount() == 0
+    fin['Kode'] = np.where(is_fst, fin['Kode'], '')
+    fin['Nama'] = np.where(is_fst, fin['Nama'], '')
+    return fin
+
+
+def assert_same_gl(df, coa, opening=None, start=None):
+    new, old = report_gl(df, coa, opening, start), report_gl_loop(df, coa, opening, start)
+    assert list(new.columns) == list(old.columns)
+    # Urutan baris, saldo berjalan, dan kolom debit/kredit harus sama persis (indeks diabaikan)
+    pd.testing.assert_frame_equal(new.reset_index(drop=True), old.reset_index(drop=True), check_dtype=False, check_exact=True)
+    return new
+
+
+COA = pd.DataFrame([
+    ('1-1100', 'Kas', 'Aset', 'Debit'),
+    ('2-1100', 'Utang Usaha', 'Liabilitas', 'Credit'),
+    ('3-1100', 'Modal', 'Ekuitas', 'Credit'),
+    ('4-1100', 'Penjualan', 'Pendapatan', 'Credit'),
+    ('6-1100', 'Beban Gaji', 'Beban', 'Debit'),
+], columns=['account_code', 'account_name', 'account_type', 'normal_balance'])
+
+
+def small_lines():
+    rows = [
+        # journal_id, tanggal, deskripsi, akun, debit, kredit
+        (1, '2025-01-03', 'Setoran modal', '1-1100', 5000, 0),
+        (1, '2025-01-03', 'Setoran modal', '3-1100', 0, 5000),
+        (2, '2025-01-03', 'Penjualan', '1-1100', 1200, 0),      # tanggal sama: urut journal_id
+        (2, '2025-01-03', 'Penjualan', '4-1100', 0, 1200),
+        (3, '2025-01-05', 'Gaji', '6-1100', 7000, 0),          # kas jadi negatif -> pindah ke Saldo K
+        (3, '2025-01-05', 'Gaji', '1-1100', 0, 7000),
+        (4, '2025-01-07', 'Utang dibayar', '2-1100', 300, 0),   # akun kredit bersaldo debit
+        (4, '2025-01-07', 'Utang dibayar', '1-1100', 0, 300),
+        (5, '2025-01-07', 'Akun di luar COA', '9-9999', 10, 0),
+        (5, '2025-01-07', 'Akun di luar COA', '1-1100', 0, 10),
+    ]
+    df = pd.DataFrame(rows, columns=['journal_id', 'transaction_date', 'description_entry', 'account_code', 'debit_amount', 'credit_amount'])
+    df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+    df[['debit_amount', 'credit_amount']] = df[['debit_amount', 'credit_amount']].astype(float)
+    return df
+
+
+def test_report_gl_matches_loop_small_ledger():
+    gl = assert_same_gl(small_lines(), COA)
+    # Kas: 5000, 6200, -800 (Saldo K), -1100, -1110
+    kas = gl.iloc[:5]
+    assert kas['Saldo D'].tolist() == [5000, 6200, 0, 0, 0]
+    assert kas['Saldo K'].tolist() == [0, 0, 800, 1100, 1110]
+    assert (gl['Kode'] != '').sum() == 5
+
+
+def test_report_gl_matches_loop_with_opening_balance():
+    opening = pd.DataFrame({'account_code': ['1-1100', '2-1100', '4-1100'], 'debit_amount': [2500.0, 0.0, 0.0], 'credit_amount': [0.0, 900.0, 100.0]})
+    gl = assert_same_gl(small_lines(), COA, opening, date(2025, 1, 1))
+    assert gl.iloc[0]['Ket'] == 'Saldo Awal' and gl.iloc[0]['Saldo D'] == 2500
+
+
+def test_report_gl_opening_only_and_empty():
+    opening = pd.DataFrame({'account_code': ['1-1100'], 'debit_amount': [100.0], 'credit_amount': [0.0]})
+    assert_same_gl(small_lines().iloc[:0], COA, opening, date(2025, 1, 1))
+    assert report_gl(small_lines().iloc[:0], COA).empty and report_gl_loop(small_lines().iloc[:0], COA).empty
+
+
+@pytest.mark.parametrize("start,end", [(date(2024, 1, 1), date(2025, 12, 31)), (date(2024, 7, 1), date(2024, 9, 30))])
+def test_report_gl_matches_loop_synthetic_ledger(start, end):
+    d = synthetic_ledger(3000, seed=4)
+    # Periode kedua punya saldo awal dari jurnal sebelum `start`
+    df, coa, _, opening = period_data(d, start, end)
+    assert opening.empty == (start == date(2024, 1, 1))
+    assert_same_gl(df, coa, opening, start)
@@ -0,0 +1,94 @@
+"""`LedgerCache` harus sama dengan isi ledger di server setelah load, refresh (baris terlambat dan bertanggal mundur), dan pelebaran jendela."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from ledger_store import ADJUSTING_JOURNAL_ID, LedgerCache, truncated_tables
+from report_benchmark import synthetic_ledger
+
+from fake_supabase import FakeSupabase
+
+START, END = date(2024, 7, 1), date(2025, 12, 31)
+SALE = [("1-1100", 750000, 0), ("4-1100", 0, 750000)]
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    # Cukup besar agar jurnal jendela terbagi ke beberapa halaman PAGE_SIZE
+    return synthetic_ledger(12000, seed=3)
+
+
+def server_lines(db):
+    """Jurnal dan baris jurnal (dengan tanggal jurnalnya) yang terlihat di server."""
+    ent = pd.DataFrame(db.tables["journal_entries"]).assign(transaction_date=lambda d: pd.to_datetime(d['transaction_date']))
+    lines = pd.DataFrame(db.tables["journal_lines"]).merge(ent[['id', 'transaction_date']].rename(columns={'id': 'journal_id'}), on='journal_id')
+    return ent, lines
+
+
+def totals(df):
+    """{(akun, adjusting): (debit, kredit)} tanpa saldo nol."""
+    if 'adjusting' not in df.columns: df = df.assign(adjusting=df['journal_id'] >= ADJUSTING_JOURNAL_ID)
+    g = df.astype({'account_code': str}).groupby(['account_code', 'adjusting'])[['debit_amount', 'credit_amount']].sum()
+    return {k: (round(d, 2), round(c, 2)) for k, (d, c) in g.iterrows() if abs(d) >= 0.005 or abs(c) >= 0.005}
+
+
+def assert_matches(cache, db, start, end):
+    snap = cache.snapshot(start, end)
+    floor, ceil = snap["window"]
+    ent, lines = server_lines(db)
+    inside = ent['transaction_date'].between(floor or pd.Timestamp.min, ceil or pd.Timestamp.max)
+    # Setiap jurnal dan baris jurnal jendela tepat sekali
+    assert sorted(snap["entries"]['id'].tolist()) == sorted(ent.loc[inside, 'id'].tolist())
+    assert sorted(snap["lines"]['id'].tolist()) == sorted(lines.loc[lines['journal_id'].isin(ent.loc[inside, 'id']), 'id'].tolist())
+    before = lines[lines['transaction_date'] < floor] if floor is not None else lines.iloc[:0]
+    assert totals(snap["opening"]) == totals(before)
+    for d in (floor, pd.Timestamp(2025, 3, 31), ceil or lines['transaction_date'].max()):
+        if d is None: continue
+        assert totals(snap["index"].as_of(d)) == totals(lines[lines['transaction_date'] <= d])
+    assert sorted(snap["mov"]['id'].tolist()) == [r["id"] for r in db.tables["inventory_movements"]]
+    assert not truncated_tables(snap["counts"])
+
+
+def test_journal_inserted_during_load_is_not_duplicated(ledger):
+    db = FakeSupabase(ledger)
+    inserted = []
+
+    def insert_backdated(query):
+        # Jurnal manual bertanggal mundur masuk setelah halaman pertama jurnal jendela dibaca
+        if query.table == "journal_entries" and "journal_lines" in query.embeds and not inserted:
+            inserted.append(db.add_entry("2024-08-15", SALE))
+
+    db.on_request = insert_backdated
+    cache = LedgerCache(db).load(START, END)
+    assert inserted and len(cache.data["entries"]) > 1000
+    assert_matches(cache, db, START, END)
+
+
+def test_refresh_and_extend_match_server(ledger):
+    db = FakeSupabase(ledger)
+    # Jurnal terakhir (di dalam jendela) belum ter-commit saat cache dimuat
+    in_flight = db.top("journal_entries") - 2
+    db.hold(in_flight)
+    cache = LedgerCache(db).load(START, END)
+    assert in_flight not in set(cache.data["entries"]['id'])
+    assert_matches(cache, db, START, END)
+
+    # Setelah dimuat: jurnal bertanggal mundur yang ter-commit terlambat (id di bawah jurnal yang
+    # sudah terlihat), jurnal baru di dalam, sebelum, dan sesudah jendela
+    db.add_entry("2024-03-05", SALE, hold=True)
+    db.add_entry("2025-01-15", SALE)
+    db.add_entry("2024-05-20", SALE)
+    db.add_entry("2026-02-01", SALE)
+    assert cache.refresh() > 0
+    db.commit()
+    cache.refresh()
+    assert_matches(cache, db, START, END)
+
+    # Lebarkan ke belakang (baris yang sudah dilipat ke saldo awal masuk jendela) lalu ke depan
+    assert_matches(cache, db, date(2024, 2, 1), END)
+    assert_matches(cache, db, date(2024, 2, 1), None)
+    # Refresh tanpa perubahan tidak menerapkan ulang baris di jangkauan tumpang tindih
+    version = cache.version
+    assert cache.refresh() == 0 and cache.version == version
+    assert_matches(cache, db, None, None)
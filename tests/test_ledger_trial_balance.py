@@ -0,0 +1,78 @@
+"""RPC `ledger_trial_balance` (dijalankan di SQLite) harus menghasilkan TB dan laporan penutup yang sama dengan `calc_tb` atas baris jurnal."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from financial_reports import calc_tb, closing_reports
+from ledger_store import ADJUSTING_JOURNAL_ID, LedgerCache, fetch_trial_balance
+from report_benchmark import synthetic_ledger
+
+from fake_supabase import Result, balance_rpc, ledger_sqlite
+
+
+class SqlClient:
+    """Pengganti klien Supabase: rpc() menjalankan SQL migrasi di SQLite; akses tabel dianggap gagal (jendela tidak boleh dimuat)."""
+
+    def __init__(self, d):
+        ent, ln = d["entries"], d["lines"]
+        self.con = ledger_sqlite(
+            [dict(id=i, transaction_date=t) for i, t in zip(ent['id'].tolist(), ent['transaction_date'].dt.strftime('%Y-%m-%d'))],
+            [dict(id=i, journal_id=j, account_code=a, debit_amount=dr, credit_amount=cr) for i, j, a, dr, cr in zip(
+                ln['id'].tolist(), ln['journal_id'].tolist(), ln['account_code'].astype(str), ln['debit_amount'].tolist(), ln['credit_amount'].tolist())])
+        self.rpc_calls = []
+
+    def rpc(self, fn, params):
+        self.rpc_calls.append(fn)
+        return Result(balance_rpc(self.con, fn, params))
+
+    def table(self, name):
+        raise AssertionError(f"tabel {name} tidak boleh dibaca")
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    return synthetic_ledger(3000, seed=7)
+
+
+def journal_lines(d, start=None, end=None, max_entry=None, max_line=None):
+    """Baris jurnal (gabung tanggal) yang lolos filter yang sama dengan RPC."""
+    df = d["lines"].merge(d["entries"][['id', 'transaction_date']].rename(columns={'id': 'journal_id'}), on='journal_id')
+    if start is not None: df = df[df['transaction_date'] >= pd.Timestamp(start)]
+    if end is not None: df = df[df['transaction_date'] <= pd.Timestamp(end)]
+    if max_entry is not None: df = df[df['journal_id'] <= max_entry]
+    if max_line is not None: df = df[df['id'] <= max_line]
+    return df
+
+
+def assert_same_tb(rpc, df, coa):
+    pd.testing.assert_frame_equal(calc_tb(None, coa, rpc).reset_index(drop=True), calc_tb(df, coa).reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("end", [date(2024, 3, 31), date(2024, 12, 31), date(2025, 6, 30), None])
+def test_rpc_matches_calc_tb(ledger, end):
+    rpc = fetch_trial_balance(SqlClient(ledger), end)
+    df = journal_lines(ledger, end=end)
+    assert not rpc.empty and rpc['adjusting'].any() == (df['journal_id'] >= ADJUSTING_JOURNAL_ID).any()
+    assert_same_tb(rpc, df, ledger["coa"])
+    # Laporan penutup (termasuk kolom MJ dari jurnal penyesuaian) juga harus sama dengan saldo dari indeks
+    via_rpc, via_index = closing_reports(ledger["coa"], rpc), closing_reports(ledger["coa"], ledger["index"].as_of(end))
+    pd.testing.assert_frame_equal(via_rpc["WS"], via_index["WS"], check_dtype=False)
+    assert via_rpc["Laba Bersih"] == pytest.approx(via_index["Laba Bersih"])
+
+
+def test_rpc_period_and_marks(ledger):
+    start, end = date(2024, 7, 1), date(2024, 9, 30)
+    assert_same_tb(fetch_trial_balance(SqlClient(ledger), end, start), journal_lines(ledger, start, end), ledger["coa"])
+    # Mark membekukan hasil: baris dengan id di atas mark tidak ikut
+    marks = {"entries": 600, "lines": 1500}
+    assert_same_tb(fetch_trial_balance(SqlClient(ledger), None, marks=marks),
+                   journal_lines(ledger, max_entry=600, max_line=1500), ledger["coa"])
+
+
+def test_cache_balances_use_rpc_without_loading_window(ledger):
+    client = SqlClient(ledger)
+    cache = LedgerCache(client)
+    end = date(2025, 3, 31)
+    assert_same_tb(cache.balances(end), journal_lines(ledger, end=end), ledger["coa"])
+    assert client.rpc_calls == ["ledger_trial_balance"] and not cache.data
@@ -0,0 +1,39 @@
+"""Kegagalan sementara terus diulang sampai budget jam habis; hanya error pasti yang langsung `failed`."""
+import pytest
+
+from notification_queue import NotificationQueue, QueueWorkers, retried_seconds
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return NotificationQueue(str(tmp_path / "queue.sqlite3"))
+
+
+def run_once(queue, workers):
+    """Klaim dan proses satu notifikasi, abaikan jeda backoff."""
+    queue._conn().execute("update notifications set available_at = 0")
+    job = queue.claim(); workers._process(job)
+    return queue._conn().execute("select state, attempts from notifications where id = ?", (job["id"],)).fetchone()
+
+
+def test_transient_errors_retry_until_hours_budget(queue):
+    def down(job): raise ConnectionError("supabase down")
+    workers = QueueWorkers(queue, down, retry_hours=1)
+    queue.put(1, "settlement", "t1", {})
+    attempts = next(n for n in range(1, 100) if retried_seconds(n) >= 3600)
+    # Jauh melewati 5 percobaan (~30 detik) tanpa menjadi failed
+    for _ in range(attempts - 1):
+        assert run_once(queue, workers)["state"] == "queued"
+    assert tuple(run_once(queue, workers)) == ("failed", attempts)
+    assert queue.counts() == {"failed": 1}
+    # Setelah Supabase pulih, notifikasi bisa diantrekan ulang dan diposting
+    assert queue.redrive() == 1
+    workers.handler = lambda job: {"status": "ok"}
+    assert tuple(run_once(queue, workers)) == ("done", 1)
+
+
+def test_error_result_fails_without_retry(queue):
+    workers = QueueWorkers(queue, lambda job: {"status": "error", "message": "Order 1 not found; journal not recorded"})
+    queue.put(1, "settlement", "t1", {})
+    assert tuple(run_once(queue, workers)) == ("failed", 1)
+    assert queue._conn().execute("select last_error from notifications").fetchone()[0].startswith("Order 1 not found")
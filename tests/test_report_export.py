@@ -0,0 +1,35 @@
+"""File sementara ekspor tidak boleh tertinggal di direktori temp."""
+import gc
+import os
+import time
+
+import pandas as pd
+
+import report_export
+from report_export import TEMP_PREFIX, start_export, sweep_exports
+
+
+def reports():
+    return {"JU": pd.DataFrame({"Tanggal": ["2025-01-01"] * 3, "Debit": [1, 2, 3]}), "Laba Bersih": 6.0}
+
+
+def test_discard_and_garbage_collection_remove_file():
+    job = start_export(reports(), "csv"); job.future.result()
+    assert job.ok and os.path.exists(job.path)
+    job.discard()
+    assert not os.path.exists(job.path)
+
+    job = start_export(reports(), "xlsx"); job.future.result()
+    path = job.path
+    del job; gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_sweep_removes_only_old_exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_export.tempfile, "gettempdir", lambda: str(tmp_path))
+    old, new, other = tmp_path / f"{TEMP_PREFIX}old.xlsx", tmp_path / f"{TEMP_PREFIX}new.zip", tmp_path / "lain.xlsx"
+    for p in (old, new, other): p.write_bytes(b"x")
+    stale = time.time() - report_export.EXPORT_MAX_AGE - 60
+    os.utime(old, (stale, stale)); os.utime(other, (stale, stale))
+    assert sweep_exports() == 1
+    assert not old.exists() and new.exists() and other.exists()
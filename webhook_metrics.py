@@ -0,0 +1,72 @@
+# webhook_metrics.py
+"""
+Metrik Prometheus untuk webhook_server (endpoint /metrics).
+
+- webhook_notifications_received_total{transaction_status, result}: notifikasi yang
+  masuk (queued / duplicate / error)
+- webhook_notifications_processed_total{transaction_status, result}: hasil pemrosesan
+  oleh worker (ok / duplicate / failed / exception; exception diulang antrean)
+- webhook_request_duration_seconds: lama request HTTP webhook (parse s.d. dibalas)
+- webhook_notification_latency_seconds: notifikasi diterima s.d. selesai diposting
+  (termasuk antre)
+- webhook_stage_duration_seconds{stage}: per tahap (parse, enqueue, queue_wait,
+  post_journal, order_update)
+- webhook_supabase_call_duration_seconds{call}: per pemanggilan Supabase
+- webhook_requests_in_progress, webhook_postings_in_progress, webhook_queue_depth{state}
+
+Bila PROMETHEUS_MULTIPROC_DIR diisi (server multi-proses), metrik semua worker
+digabung lewat MultiProcessCollector.
+"""
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+# Label transaction_status dibatasi ke nilai Midtrans yang dikenal agar kardinalitas tetap kecil
+KNOWN_STATUSES = {"capture", "settlement", "pending", "deny", "expire", "cancel", "refund", "partial_refund", "authorize", "failure"}
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300)
+
+RECEIVED = Counter("webhook_notifications_received_total", "Notifikasi Midtrans yang masuk per status dan hasil", ["transaction_status", "result"])
+PROCESSED = Counter("webhook_notifications_processed_total", "Notifikasi yang diproses worker per status dan hasil", ["transaction_status", "result"])
+REQUEST_LATENCY = Histogram("webhook_request_duration_seconds", "Lama request HTTP webhook", buckets=LATENCY_BUCKETS)
+NOTIFICATION_LATENCY = Histogram("webhook_notification_latency_seconds", "Notifikasi diterima s.d. selesai diproses", buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram("webhook_stage_duration_seconds", "Lama per tahap pemrosesan", ["stage"], buckets=LATENCY_BUCKETS)
+SUPABASE_LATENCY = Histogram("webhook_supabase_call_duration_seconds", "Lama per pemanggilan Supabase", ["call"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_PROGRESS = Gauge("webhook_requests_in_progress", "Request webhook yang sedang dilayani", multiprocess_mode="livesum")
+POSTINGS_IN_PROGRESS = Gauge("webhook_postings_in_progress", "Notifikasi yang sedang diproses worker", multiprocess_mode="livesum")
+QUEUE_DEPTH = Gauge("webhook_queue_depth", "Isi antrean notifikasi per state", ["state"], multiprocess_mode="livemax")
+
+
+def status_label(transaction_status):
+    return transaction_status if transaction_status in KNOWN_STATUSES else "other"
+
+
+@contextmanager
+def stage(name):
+    """Ukur satu tahap pemrosesan."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(name).observe(time.perf_counter() - t)
+
+
+@contextmanager
+def supabase_call(name):
+    """Ukur satu pemanggilan Supabase."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        SUPABASE_LATENCY.labels(name).observe(time.perf_counter() - t)
+
+
+def render(queue_counts=None):
+    """(body, content type) untuk /metrics; `queue_counts` = {state: jumlah} dari antrean."""
+    for state in ("queued", "processing", "done", "failed"):
+        QUEUE_DEPTH.labels(state).set((queue_counts or {}).get(state, 0))
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,115 +1,219 @@
 import os
+import time
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException
-from supabase_client import supabase 
+from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi.responses import JSONResponse
+from supabase_client import supabase, connect
+from notification_queue import NotificationQueue, ProcessedNotifications, QueueWorkers, QUEUE_PATH
+from webhook_metrics import (NOTIFICATION_LATENCY, POSTINGS_IN_PROGRESS, PROCESSED, RECEIVED, REQUEST_LATENCY,
+                             REQUESTS_IN_PROGRESS, STAGE_LATENCY, render, stage, status_label, supabase_call)
 from dotenv import load_dotenv
-from datetime import date 
 
 load_dotenv()
 
-app = FastAPI(title="Midtrans Webhook Listener & Accounting Processor")
-
 MIDTRANS_SERVER_KEY = os.getenv("MIDTRANS_SERVER_KEY")
 
+# Pemanggilan sinkron (antrean SQLite, Supabase) dijalankan di pool thread ini, bukan
+# di event loop; dibatasi agar burst notifikasi tidak membanjiri database
+DB_WORKERS = int(os.getenv("WEBHOOK_DB_WORKERS", "16"))
+_db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="webhook-db")
+
+# Mode batch (opsional): posting settle dari beberapa worker digabung menjadi satu RPC
+# per WEBHOOK_BATCH_SIZE order atau per WEBHOOK_BATCH_WINDOW_MS, mana yang lebih dulu
+BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "0"))
+BATCH_WINDOW = float(os.getenv("WEBHOOK_BATCH_WINDOW_MS", "200")) / 1000
+
+# Notifikasi disimpan dulu ke antrean lokal lalu dibalas 200; jurnal diposting worker latar belakang.
+# Di mode batch, jumlah worker minimal sebesar batch agar batch bisa terisi penuh
+QUEUE_WORKERS = int(os.getenv("WEBHOOK_QUEUE_WORKERS", str(max(4, BATCH_SIZE))))
+# Saat berhenti (deploy), antrean dikuras dan posting yang berjalan ditunggu selama ini; harus
+# di bawah graceful timeout server. Yang belum selesai diambil ulang setelah lease-nya habis
+DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "25"))
+queue = NotificationQueue(QUEUE_PATH)
+# Kiriman ulang Midtrans (dan capture + settlement untuk transaksi yang sama) tidak diposting dua kali
+processed = ProcessedNotifications(queue)
+
+async def run_db(fn, *args):
+    """Jalankan fungsi sinkron (SQLite/Supabase) di pool thread agar event loop tetap bebas melayani request lain."""
+    return await asyncio.get_running_loop().run_in_executor(_db_pool, fn, *args)
+
+def notification_key(order_id, transaction_status, transaction_id):
+    """Kunci idempotensi; capture dan settlement sama-sama berarti 'settle'."""
+    return (order_id, transaction_id or "", order_status(transaction_status))
+
+def enqueue(order_id, transaction_status, transaction_id, payload):
+    """Simpan notifikasi ke antrean; None bila sudah pernah diproses."""
+    if processed.seen(notification_key(order_id, transaction_status, transaction_id)): return None
+    return queue.put(order_id, transaction_status, transaction_id, payload)
+
+def process_job(job):
+    """Handler worker antrean: posting satu notifikasi yang tersimpan, sekali per kunci idempotensi."""
+    label = status_label(job["transaction_status"])
+    # Lama notifikasi menunggu worker sejak siap diproses (claim mengisi updated_at)
+    STAGE_LATENCY.labels("queue_wait").observe(max(job["updated_at"] - job["available_at"], 0))
+    with POSTINGS_IN_PROGRESS.track_inprogress():
+        try:
+            result = _process_job(job)
+        except Exception:
+            PROCESSED.labels(label, "exception").inc()
+            raise
+    PROCESSED.labels(label, "duplicate" if result.get("duplicate") else "ok" if result["status"] == "ok" else "failed").inc()
+    NOTIFICATION_LATENCY.observe(time.time() - job["received_at"])
+    return result
+
+def _process_job(job):
+    key = notification_key(job["order_id"], job["transaction_status"], job["transaction_id"])
+    if processed.seen(key):
+        print(f"DUPLIKAT: notifikasi {key} sudah diproses, dilewati.")
+        return {"status": "ok", "duplicate": True}
+    result = apply_notification(job["order_id"], job["transaction_status"], job["transaction_id"])
+    if result["status"] == "ok": processed.add(key, result.get("journal_id"))
+    return result
+
+workers = QueueWorkers(queue, process_job, workers=QUEUE_WORKERS)
+
+def reset_after_fork():
+    """Dipanggil di proses worker setelah fork (server dengan preload): klien Supabase sendiri per worker."""
+    global supabase
+    supabase = connect()
+
+@asynccontextmanager
+async def lifespan(app):
+    queue.prune()
+    workers.start()
+    yield
+    # Habiskan notifikasi yang masih antre lalu berhenti, paling lama DRAIN_TIMEOUT;
+    # yang belum sempat tetap tersimpan di file antrean untuk proses berikutnya
+    if not workers.stop(DRAIN_TIMEOUT, drain=True):
+        print(f"PERINGATAN: antrean belum habis setelah {DRAIN_TIMEOUT:.0f} dtk; sisanya dikerjakan proses berikutnya (butuh WEBHOOK_QUEUE_PATH di volume persisten).")
+    _db_pool.shutdown(wait=True)
+
+app = FastAPI(title="Midtrans Webhook Listener & Accounting Processor", lifespan=lifespan)
+
 # ===============================================
 # FUNGSI AKUNTANSI & INVENTORY
 # ===============================================
 
-def record_sales_journal(order_id: int):
+def post_sales_journal(order_id: int, transaction_id=None):
+    """Satu RPC post_sales_journal; id jurnal atau None bila order tidak ditemukan."""
+    with supabase_call("rpc.post_sales_journal"):
+        return supabase.rpc("post_sales_journal", {
+            "p_order_id": order_id,
+            "p_transaction_id": transaction_id,
+        }).execute().data
+
+class JournalBatcher:
     """
-    Mencatat Jurnal Penjualan, HPP, dan Pergerakan Persediaan (ISSUE).
+    Gabungkan posting settle dari beberapa thread worker menjadi satu RPC
+    post_sales_journals (tetap satu jurnal per order). Pemanggil pertama di
+    batch kosong menunggu sampai batch penuh atau jendela waktu habis, lalu
+    mengirimnya; pemanggil lain menunggu hasil order masing-masing.
     """
-    try:
-        # 1. Ambil Detail Pesanan dan Barang (Order Items)
-        order_response = supabase.table("orders").select(
-            "*, order_items(*, products(id, cost_price, inventory_account_code, hpp_account_code))"
-        ).eq("id", order_id).execute()
-        
-        if not order_response.data:
-            print(f"ERROR: Order ID {order_id} tidak ditemukan untuk Jurnal.")
-            return False
-
-        order = order_response.data[0]
-        total_revenue = order["total_amount"]
-        
-        # Akun Kompleks yang Digunakan (Sesuai COA Anda)
-        CASH_ACCOUNT = '1-1100'   # Kas
-        SALES_ACCOUNT = '4-1100'  # Penjualan
-        
-        lines = []
-        movements_to_insert = []
-
-        # --- 2. JURNAL 1: PENJUALAN (CASH vs REVENUE) ---
-        
-        # [PERBAIKAN PENTING] Menambahkan transaction_date agar muncul di laporan
-        journal = supabase.table("journal_entries").insert({
-            "order_id": order_id,
-            "transaction_date": str(date.today()), # <--- WAJIB ADA
-            "description": f"Jurnal Penjualan Tunai Order ID: {order_id}",
-            "user_id": order.get("user_id") 
-        }).execute().data[0]
-        journal_id = journal["id"]
-
-        # DEBIT: KAS
-        lines.append({
-            "journal_id": journal_id, "account_code": CASH_ACCOUNT, 
-            "debit_amount": total_revenue, "credit_amount": 0
-        })
-        
-        # KREDIT: PENJUALAN
-        lines.append({
-            "journal_id": journal_id, "account_code": SALES_ACCOUNT, 
-            "debit_amount": 0, "credit_amount": total_revenue
-        })
-        
-        # --- 3. JURNAL 2 & INVENTORY MOVEMENT: HPP & STOK KELUAR ---
-        
-        for item in order["order_items"]:
-            product_id = item["product_id"]
-            quantity_sold = item["quantity"]
-            
-            product_data = item.get("products", {})
-            cost_price = product_data.get("cost_price", 0)
-            inventory_acc = product_data.get("inventory_account_code", '1-1200')
-            hpp_acc = product_data.get("hpp_account_code", '5-1100')           
-
-            if cost_price > 0 and quantity_sold > 0:
-                cost_of_sale = quantity_sold * cost_price
-
-                # DEBIT: HPP
-                lines.append({
-                    "journal_id": journal_id, "account_code": hpp_acc, 
-                    "debit_amount": cost_of_sale, "credit_amount": 0
-                })
-                
-                # KREDIT: PERSEDIAAN
-                lines.append({
-                    "journal_id": journal_id, "account_code": inventory_acc, 
-                    "debit_amount": 0, "credit_amount": cost_of_sale
-                })
-
-                # CATAT INVENTORY MOVEMENT (UNIT KELUAR)
-                movements_to_insert.append({
-                    "product_id": product_id,
-                    "movement_date": str(date.today()), 
-                    "movement_type": "ISSUE", 
-                    "quantity_change": -quantity_sold, 
-                    "unit_cost": cost_price,
-                    "reference_id": f"ORDER-{order_id}",
-                })
-
-        if lines:
-            supabase.table("journal_lines").insert(lines).execute()
-        
-        if movements_to_insert:
-            supabase.table("inventory_movements").insert(movements_to_insert).execute()
-
-        print(f"SUCCESS: Jurnal dan Inventory Movement untuk Order {order_id} berhasil dicatat.")
-        return True
-
-    except Exception as e:
-        print(f"FATAL ERROR PENCATATAN JURNAL untuk Order {order_id}: {e}")
-        return False
+
+    def __init__(self, size, window):
+        self.size, self.window = size, window
+        self._cond = threading.Condition()
+        self._batch = []
+
+    def post(self, order_id, transaction_id=None):
+        future = Future()
+        with self._cond:
+            self._batch.append((order_id, transaction_id, future))
+            leader = len(self._batch) == 1
+            if len(self._batch) >= self.size: self._cond.notify_all()
+            if leader:
+                deadline = time.monotonic() + self.window
+                while len(self._batch) < self.size and deadline > time.monotonic():
+                    self._cond.wait(deadline - time.monotonic())
+                batch, self._batch = self._batch, []
+        if leader: self._flush(batch)
+        return future.result()
+
+    def _flush(self, batch):
+        try:
+            with supabase_call("rpc.post_sales_journals"):
+                rows = supabase.rpc("post_sales_journals", {
+                    "p_orders": [{"order_id": o, "transaction_id": t} for o, t, _ in batch],
+                }).execute().data
+            journal_ids = {r["order_id"]: r["journal_id"] for r in rows}
+            for order_id, _, future in batch: future.set_result(journal_ids.get(order_id))
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e); return
+            # Satu transaksi per batch: bila gagal, ulang per order agar order lain tidak ikut tertahan
+            # (aman walau batch sebenarnya sudah commit: RPC mengembalikan jurnal yang sudah ada)
+            print(f"ERROR posting batch {len(batch)} order: {e}. Diulang per order.")
+        for order_id, transaction_id, future in batch:
+            try:
+                future.set_result(post_sales_journal(order_id, transaction_id))
+            except Exception as e:
+                future.set_exception(e)
+
+batcher = JournalBatcher(BATCH_SIZE, BATCH_WINDOW) if BATCH_SIZE > 1 else None
+
+def record_sales_journal(order_id: int, transaction_id=None):
+    """
+    Mencatat Jurnal Penjualan, HPP, Pergerakan Persediaan (ISSUE), dan status
+    order 'settle' dalam satu panggilan RPC transaksional (post_sales_journal):
+    semua tersimpan atau tidak sama sekali. Mengembalikan id jurnal, atau None
+    bila order tidak ditemukan. Kegagalan diteruskan sebagai exception agar
+    antrean mengulang posting (aman: tidak ada yang tersimpan setengah, dan
+    order yang sudah berjurnal hanya mengembalikan id jurnalnya).
+    Di mode batch, posting digabung dengan order lain lewat `batcher`.
+    """
+    journal_id = (batcher.post if batcher else post_sales_journal)(order_id, transaction_id)
+
+    if journal_id is None:
+        print(f"ERROR: Order ID {order_id} tidak ditemukan untuk Jurnal.")
+        return None
+
+    print(f"SUCCESS: Jurnal dan Inventory Movement untuk Order {order_id} berhasil dicatat.")
+    return journal_id
+
+def order_status(transaction_status):
+    """Status order untuk transaction_status Midtrans."""
+    if transaction_status in ["capture", "settlement"]:
+        return "settle"
+    elif transaction_status == "pending":
+        return "pending"
+    elif transaction_status in ["deny", "expire", "cancel"]:
+        return "failed"
+    return transaction_status
+
+def apply_notification(order_id: int, transaction_status, transaction_id):
+    """
+    Bagian sinkron webhook: bila lunas, posting jurnal sekaligus status order
+    (satu RPC); selain itu cukup perbarui status order. Mengembalikan body respons untuk Midtrans.
+    """
+    new_status = order_status(transaction_status)
+
+    if new_status == "settle":
+        # Jurnal + update status order dalam satu transaksi database
+        with stage("post_journal"):
+            journal_id = record_sales_journal(order_id, transaction_id)
+        if journal_id is None:
+            return {"status": "error", "message": f"Order {order_id} not found; journal not recorded"}
+        return {"status": "ok", "journal_recorded": True, "journal_id": journal_id}
+
+    # UPDATE STATUS DI SUPABASE MENGGUNAKAN ID ASLI
+    with stage("order_update"), supabase_call("orders.update"):
+        update_response = supabase.table("orders").update({
+            "status": new_status,
+            "midtrans_order_id": transaction_id 
+        }).eq("id", order_id).execute()
+
+    if not update_response.data:
+        print(f"ERROR: Gagal memperbarui status order {order_id} di Supabase.")
+        # Update tanpa baris hasil: tidak ada order dengan id ini
+        return {"status": "error", "message": f"Order {order_id} not found; status not updated"}
+
+    return {"status": "ok", "journal_recorded": False}
 
 # ===============================================
 # FUNGSI MIDTRANS WEBHOOK
@@ -118,57 +222,75 @@ def record_sales_journal(order_id: int):
 @app.post("/midtrans/notification")
 async def midtrans_notification(request: Request):
     """Endpoint Midtrans Notification URL."""
-    try:
-        payload = await request.json()
-        
-        # Ambil order_id mentah (misal: "15-1732412345")
-        raw_order_id = str(payload.get("order_id", ""))
-        
-        # BERSIHKAN ID: Ambil bagian sebelum tanda strip (-)
-        if "-" in raw_order_id:
-            order_id = raw_order_id.split("-")[0]
-        else:
-            order_id = raw_order_id
+    with REQUESTS_IN_PROGRESS.track_inprogress(), REQUEST_LATENCY.time():
+        transaction_status = None
+        try:
+            with stage("parse"):
+                payload = await request.json()
+                
+                # Ambil order_id mentah (misal: "15-1732412345")
+                raw_order_id = str(payload.get("order_id", ""))
+                
+                # BERSIHKAN ID: Ambil bagian sebelum tanda strip (-)
+                if "-" in raw_order_id:
+                    order_id = raw_order_id.split("-")[0]
+                else:
+                    order_id = raw_order_id
+                    
+                transaction_status = payload.get("transaction_status")
+                transaction_id = payload.get("transaction_id")
             
-        transaction_status = payload.get("transaction_status")
-        transaction_id = payload.get("transaction_id")
-        
-        if not order_id:
-            raise HTTPException(status_code=400, detail="Missing order_id in payload")
+            if not order_id:
+                raise HTTPException(status_code=400, detail="Missing order_id in payload")
 
-        print(f"Notifikasi diterima untuk Order ID Asli: {order_id} (Raw: {raw_order_id}). Status: {transaction_status}")
+            print(f"Notifikasi diterima untuk Order ID Asli: {order_id} (Raw: {raw_order_id}). Status: {transaction_status}")
 
-        new_status = ""
-        journal_recorded = False
+            # Kiriman ulang yang sudah diproses langsung dibalas tanpa I/O apa pun
+            if processed.cached(notification_key(int(order_id), transaction_status, transaction_id)):
+                RECEIVED.labels(status_label(transaction_status), "duplicate").inc()
+                return {"status": "ok", "duplicate": True}
 
-        if transaction_status in ["capture", "settlement"]:
-            new_status = "settle"
-            # Catat jurnal menggunakan ID asli yang sudah bersih
-            journal_recorded = record_sales_journal(int(order_id)) 
-            
-        elif transaction_status == "pending":
-            new_status = "pending"
-        elif transaction_status in ["deny", "expire", "cancel"]:
-            new_status = "failed"
-        else:
-            new_status = transaction_status
-            
-        # UPDATE STATUS DI SUPABASE MENGGUNAKAN ID ASLI
-        update_response = supabase.table("orders").update({
-            "status": new_status,
-            "midtrans_order_id": transaction_id 
-        }).eq("id", int(order_id)).execute()
+            # Jalur cepat: simpan ke antrean (tahan restart) lalu balas; posting dikerjakan worker
+            with stage("enqueue"):
+                job_id = await run_db(enqueue, int(order_id), transaction_status, transaction_id, payload)
+            if job_id is None:
+                RECEIVED.labels(status_label(transaction_status), "duplicate").inc()
+                return {"status": "ok", "duplicate": True}
+            workers.notify()
+            RECEIVED.labels(status_label(transaction_status), "queued").inc()
+            return {"status": "ok", "queued": job_id}
+
+        except Exception as e:
+            RECEIVED.labels(status_label(transaction_status), "error").inc()
+            print(f"ERROR Processing Webhook: {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error")
 
-        if not update_response.data:
-            print(f"ERROR: Gagal memperbarui status order {order_id} di Supabase.")
-            return {"status": "error", "message": "Supabase update failed but notification received"}
+@app.get("/healthz")
+async def healthz():
+    """Liveness: proses dan event loop masih melayani."""
+    return {"status": "ok"}
 
-        return {"status": "ok", "journal_recorded": journal_recorded}
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: antrean lokal bisa diakses dan worker antrean hidup. Supabase
+    tidak dicek; notifikasi tetap diterima ke antrean saat Supabase bermasalah.
+    """
+    try:
+        counts = await run_db(queue.counts)
+    except sqlite3.Error as e:
+        return JSONResponse({"status": "not ready", "error": str(e)}, status_code=503)
+    if not workers.running:
+        return JSONResponse({"status": "not ready", "error": "queue workers not running"}, status_code=503)
+    return {"status": "ready", "queued": counts.get("queued", 0)}
 
-    except Exception as e:
-        print(f"ERROR Processing Webhook: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+@app.get("/metrics")
+async def metrics():
+    """Metrik Prometheus (format teks)."""
+    body, content_type = render(await run_db(queue.counts))
+    return Response(content=body, media_type=content_type)
 
 
 if __name__ == "__main__":
-    uvicorn.run("webhook_server:app", host="0.0.0.0", port=8080, reload=True)
+    # Untuk pengembangan lokal (satu proses). Produksi: `gunicorn webhook_server:app` dengan gunicorn.conf.py
+    uvicorn.run("webhook_server:app", host="0.0.0.0", port=int(os.getenv("PORT", "8080")), reload=os.getenv("WEBHOOK_RELOAD") == "1")